@@ -16,14 +16,21 @@ import foodwebviz as fw
 
 
 @click.command('Generates plots for all foodwebs from given directory (containing SCOR files).')
-@click.option('--scor_dir', help='Directory with SCOR files.')
+@click.option('--scor_dir', help='Directory with foodweb files (SCOR files by default, see --format).')
 @click.option('--output', help='Directory where plots should be saved.', default='.')
 @click.option('--boundary', default=False, is_flag=True, help='Wheter to show boundary flows.')
 @click.option('--show_trophic_layer', default=True, is_flag=True, help='Wheter to show trophic layer.')
 @click.option('--switch_axes', default=False, is_flag=True, help='Wheter to switch axes.')
 @click.option('--normalization', default=None, type=click.Choice(['log', 'diet', 'biomass', 'tst']),
               help='Normalization method.')
-def draw_heatmaps(scor_dir, output, boundary, show_trophic_layer, switch_axes, normalization):
+@click.option('--validate', default=False, is_flag=True,
+              help='Whether to validate all foodwebs first and skip the invalid ones.')
+@click.option('--workers', default=1, type=int, help='Number of processes reading foodwebs.')
+@click.option('--format', 'file_format', default='SCOR',
+              type=click.Choice(['auto', 'SCOR', 'CSV', 'XLS', 'NPZ', 'PARQUET'], case_sensitive=False),
+              help='Format of foodweb files, auto recognizes it by file extension.')
+def draw_heatmaps(scor_dir, output, boundary, show_trophic_layer, switch_axes, normalization, validate, workers,
+                  file_format):
     '''Generates plots for all foodwebs from given directory (containing SCOR files).
 
     For each foodweb in directory the following files will created:
@@ -34,29 +41,44 @@ def draw_heatmaps(scor_dir, output, boundary, show_trophic_layer, switch_axes, n
 
         * network visualization (only if foodweb has less than 20 nodes)
     '''
-    for subdir, dirs, files in os.walk(scor_dir):
-        for f in files:
-            print(f'Processing: {f}...')
-            food_web = fw.read_from_SCOR(os.path.join(scor_dir, f))
-
-            fig = fw.draw_heatmap(food_web,
-                                  boundary=boundary,
-                                  normalization=normalization,
-                                  show_trophic_layer=show_trophic_layer,
-                                  switch_axes=switch_axes,
-                                  height=1000)
-            fig.write_image(f'{output}/{f}_heatmap.png')
-
-            fig = fw.draw_trophic_flows_distribution(food_web)
-            fig.write_image(f'{output}/{f}_throphic_levels_distribution.png')
-
-            fig = fw.draw_trophic_flows_heatmap(food_web)
-            fig.write_image(f'{output}/{f}_trophic_levels_heatmap.png')
-
-            if food_web.n <= 20:
-                fw.draw_network_for_nodes(food_web,
-                                          file_name=f'{output}/{f}_network.html',
-                                          notebook=False)
+    rejected = set()
+    if validate:
+        report = fw.validate_directory(scor_dir, format=file_format)
+        if not report.empty:
+            print(report.to_string(index=False))
+        rejected = set(report.Foodweb[report.Severity == 'error'])
+
+    # Parquet foodwebs are directories with nodes and flows tables
+    paths = [path for path in fw.io._list_files(scor_dir) if path not in rejected]
+    for path in sorted(rejected):
+        print(f'Skipping invalid foodweb: {os.path.basename(path)}')
+
+    # foodwebs are read in parallel and drawn as soon as they are ready
+    for path, food_web, error in fw.iter_many(paths, workers=workers, format=file_format):
+        f = os.path.basename(path)
+        if error is not None:
+            print(f'Skipping {f}: {error}')
+            continue
+        print(f'Processing: {f}...')
+
+        fig = fw.draw_heatmap(food_web,
+                              boundary=boundary,
+                              normalization=normalization,
+                              show_trophic_layer=show_trophic_layer,
+                              switch_axes=switch_axes,
+                              height=1000)
+        fig.write_image(f'{output}/{f}_heatmap.png')
+
+        fig = fw.draw_trophic_flows_distribution(food_web)
+        fig.write_image(f'{output}/{f}_throphic_levels_distribution.png')
+
+        fig = fw.draw_trophic_flows_heatmap(food_web)
+        fig.write_image(f'{output}/{f}_trophic_levels_heatmap.png')
+
+        if food_web.n <= 20:
+            fw.draw_network_for_nodes(food_web,
+                                      file_name=f'{output}/{f}_network.html',
+                                      notebook=False)
 
 
 if __name__ == "__main__":
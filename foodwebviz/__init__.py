@@ -9,6 +9,14 @@ from foodwebviz.io import *   # noqa: F401,F403
 from foodwebviz.utils import *   # noqa: F401,F403
 from foodwebviz.visualization import *   # noqa: F401,F403
 from foodwebviz.foodweb import *   # noqa: F401,F403
+from foodwebviz.collection import *   # noqa: F401,F403
+from foodwebviz.series import *   # noqa: F401,F403
+from foodwebviz.similarity import *   # noqa: F401,F403
+from foodwebviz.validation import *   # noqa: F401,F403
+from foodwebviz.store import *   # noqa: F401,F403
+from foodwebviz.ena import *   # noqa: F401,F403
+from foodwebviz.scenario import *   # noqa: F401,F403
+from foodwebviz.uncertainty import *   # noqa: F401,F403
 from foodwebviz.create_animated_food_web import *   # noqa: F401,F403
 
 
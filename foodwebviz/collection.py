@@ -0,0 +1,207 @@
+'''Class for collections of foodwebs.'''
+import numpy as np
+import pandas as pd
+
+import foodwebviz as fw
+from .foodweb import BOUNDARY_NODES
+from .io import _get_reader, _list_files
+from .normalization import normalize_flow_array
+from .utils import batch_trophic_levels
+
+
+__all__ = [
+    'FoodWebCollection'
+]
+
+
+NODE_PROPERTIES = ['Biomass', 'Import', 'Export', 'Respiration']
+
+
+class FoodWebCollection(object):
+    '''
+    Class defining a collection of food webs, e.g. seasonal or regional variants of an ecosystem.
+    Nodes are aligned by name across all foodwebs and flows are stored
+    as one stacked (k, n, n) array, so metrics are computed for all foodwebs at once.
+    '''
+
+    def __init__(self, food_webs):
+        '''Initialize a collection from a list of foodwebs.
+            Parameters
+            ----------
+            food_webs : list of foodwebs.FoodWeb
+                Foodwebs to include. Nodes with the same name are aligned,
+                nodes missing in a foodweb are masked out.
+
+            Attributes
+            ----------
+            titles : list of strings
+                Titles of foodwebs.
+            names : pd.Index
+                Names of all nodes (union over foodwebs).
+            flows : np.ndarray
+                Array of shape (k, n, n), flows[w, i, j] is the flow from node i to j in w-th foodweb.
+            mask : np.ndarray
+                Boolean array of shape (k, n), True if node is present in the foodweb.
+            is_alive : np.ndarray
+                Boolean array of shape (k, n).
+            node_properties : dict of np.ndarray
+                Arrays of shape (k, n) for 'Biomass', 'Import', 'Export' and 'Respiration'.
+        '''
+        self.titles = [food_web.title for food_web in food_webs]
+        # trophic levels are not needed, so they are not computed for lazy foodwebs
+        names = [name for food_web in food_webs for name in food_web._node_df.index]
+        self.names = pd.Index(pd.unique(np.array(names, dtype=object)), name='Names')
+
+        k, n = len(food_webs), len(self.names)
+        self.mask = np.zeros((k, n), dtype=bool)
+        self.is_alive = np.zeros((k, n), dtype=bool)
+        self.node_properties = {col: np.zeros((k, n)) for col in NODE_PROPERTIES}
+
+        indexers = []
+        for w, food_web in enumerate(food_webs):
+            idx = self.names.get_indexer(food_web._node_df.index)
+            indexers.append(idx)
+            self.mask[w, idx] = True
+            self.is_alive[w, idx] = food_web._node_df.IsAlive.values
+            for col in NODE_PROPERTIES:
+                self.node_properties[col][w, idx] = food_web._node_df[col].values
+        self._flows = self._init_flows(food_webs, indexers)
+
+    def _init_flows(self, food_webs, indexers):
+        '''Returns flows of foodwebs aligned to names as array of shape (k, n, n).'''
+        n = len(self.names)
+        flows = np.zeros((len(food_webs), n, n))
+        for w, (food_web, idx) in enumerate(zip(food_webs, indexers)):
+            web_flows = food_web.get_flow_matrix(as_frame=False)
+            flows[w][np.ix_(idx, idx)] = web_flows.toarray() if food_web.is_sparse else web_flows
+        return flows
+
+    @property
+    def flows(self):
+        '''Array of shape (k, n, n), flows[w, i, j] is the flow from node i to j in w-th foodweb.'''
+        return self._flows
+
+    @classmethod
+    def from_directory(cls, directory, format='auto', **kwargs):
+        '''Reads all foodweb files from a directory.
+
+        Parameters
+        ----------
+        directory : string
+            Path to the directory.
+        format : string, optional (default='auto')
+            'SCOR', 'CSV', 'XLS', 'NPZ', 'PARQUET' or 'auto' (format recognized by file extension).
+        kwargs
+            Additional arguments passed to the read function (e.g. io.read_from_SCOR).
+
+        Returns
+        -------
+        collection : FoodWebCollection
+        '''
+        kwargs.setdefault('eager', False)
+        return cls([_get_reader(path, format)(path, **kwargs) for path in _list_files(directory)])
+
+    def __len__(self):
+        return len(self.titles)
+
+    def __getitem__(self, w):
+        '''Returns w-th foodweb as foodwebs.FoodWeb.'''
+        present = self.mask[w]
+        node_df = pd.DataFrame({'Names': self.names[present], 'IsAlive': self.is_alive[w, present]})
+        for col in NODE_PROPERTIES:
+            node_df[col] = self.node_properties[col][w, present]
+        return fw.FoodWeb(title=self.titles[w], node_df=node_df,
+                          flow_matrix=self.flows[w][np.ix_(present, present)])
+
+    def __iter__(self):
+        return (self[w] for w in range(len(self)))
+
+    def _to_frame(self, values, columns=None):
+        '''Wraps (k, n) array in pd.DataFrame, values of missing nodes are NaN.'''
+        columns = self.names if columns is None else columns
+        values = np.where(self._boundary_mask(values.shape[1]), values, np.nan)
+        return pd.DataFrame(values, index=self._get_index(), columns=columns)
+
+    def _get_index(self):
+        '''Returns row labels of frames returned by the collection.'''
+        return self.titles
+
+    def _boundary_mask(self, size):
+        '''Returns mask of present nodes extended by boundary nodes if needed.'''
+        if size == len(self.names):
+            return self.mask
+        return np.hstack([self.mask, np.ones((len(self), size - len(self.names)), dtype=bool)])
+
+    def get_flow_matrix(self, boundary=False):
+        '''Returns stacked flow matrices.
+
+        Parameters
+        ----------
+        boundary : bool, optional (default=False)
+            If True, Import row and Export and Respiration columns are added
+            (see FoodWeb.get_flow_matrix).
+
+        Returns
+        -------
+        flows : np.ndarray
+            Array of shape (k, n, n), or (k, n + 3, n + 3) with boundary flows.
+        '''
+        if not boundary:
+            return self.flows
+        k, n = self.mask.shape
+        flows = np.zeros((k, n + 3, n + 3))
+        flows[:, :n, :n] = self.flows
+        flows[:, n, :n] = self.node_properties['Import']
+        flows[:, :n, n + 1] = self.node_properties['Export']
+        flows[:, :n, n + 2] = self.node_properties['Respiration']
+        return flows
+
+    def get_diet_matrix(self):
+        '''Returns stacked diet matrices (see FoodWeb.get_diet_matrix) as array of shape (k, n, n).'''
+        return normalize_flow_array(self.flows, 'diet')
+
+    def get_flow_sum(self):
+        '''Returns sums of flows (with boundary flows) into each node, see FoodWeb.get_flow_sum.
+
+        Returns
+        -------
+        flow_sum : pd.DataFrame
+            Rows are foodwebs, columns are nodes followed by boundary nodes.
+        '''
+        inflows = self._get_inflows() + self.node_properties['Import']
+        flow_sum = np.hstack([inflows,
+                              np.zeros((len(self), 1)),
+                              self.node_properties['Export'].sum(axis=1, keepdims=True),
+                              self.node_properties['Respiration'].sum(axis=1, keepdims=True)])
+        return self._to_frame(flow_sum, columns=list(self.names) + BOUNDARY_NODES)
+
+    def _get_inflows(self):
+        '''Returns sums of internal flows into each node as array of shape (k, n).'''
+        return self.flows.sum(axis=1)
+
+    def normalize(self, norm_type):
+        '''Returns normalized flows of all foodwebs, see normalization.normalize_flow_array.
+
+        Parameters
+        ----------
+        norm_type : string
+            Available options are: 'diet', 'log', 'donor_control',
+            'predator_control', 'mixed_control', 'linear' and 'tst'.
+
+        Returns
+        -------
+        weights : np.ndarray
+            Array of shape (k, n, n).
+        '''
+        return normalize_flow_array(self.flows, norm_type, biomass=self.node_properties['Biomass'])
+
+    def calculate_trophic_levels(self):
+        '''Calculates trophic levels of nodes in all foodwebs with a single batched solve,
+        see utils.batch_trophic_levels.
+
+        Returns
+        -------
+        trophic_levels : pd.DataFrame
+            Rows are foodwebs, columns are nodes, trophic levels of missing nodes are NaN.
+        '''
+        return self._to_frame(batch_trophic_levels(self.flows, self.is_alive))
@@ -0,0 +1,216 @@
+'''Ecological network analysis (ENA) of foodwebs.
+
+All indices are computed from the flow matrix with boundary flows
+(see FoodWeb.get_flow_matrix(boundary=True)). Intermediate results are kept in
+NetworkAnalysis and computed on first use, e.g. the integral flow matrix is obtained
+with a single matrix inversion only by the indices that need it.
+Functions accept a single foodweb, a batch (list of foodwebs or FoodWebCollection),
+in which case all foodwebs are processed with stacked array operations,
+or a NetworkAnalysis, which shares intermediate results between the functions.
+
+Examples
+--------
+
+Compute all indices for a foodweb
+>>> indices = calculate_network_indices(food_web)
+
+Compute several results of a batch with a shared analysis
+>>> analysis = NetworkAnalysis(food_webs)
+>>> throughflow = calculate_throughflow(analysis)
+>>> indices = calculate_network_indices(analysis)
+'''
+import numpy as np
+import pandas as pd
+
+from .collection import FoodWebCollection
+
+
+__all__ = [
+    'NetworkAnalysis',
+    'calculate_throughflow',
+    'calculate_structure_matrices',
+    'calculate_network_indices'
+]
+
+
+class NetworkAnalysis(object):
+    '''
+    Intermediate results of ENA of foodwebs, each computed on first use and shared
+    by all functions of this module which are given the analysis.
+    '''
+
+    def __init__(self, food_webs):
+        '''Initialize an analysis of foodwebs.
+            Parameters
+            ----------
+            food_webs : foodwebs.FoodWeb, list of foodwebs.FoodWeb or FoodWebCollection
+                Foodwebs to analyse.
+
+            Attributes
+            ----------
+            collection : FoodWebCollection
+                Analysed foodwebs.
+            is_batch : bool
+                False if a single foodweb was given, results are returned for it only.
+        '''
+        if isinstance(food_webs, FoodWebCollection):
+            self.collection, self.is_batch = food_webs, True
+        elif isinstance(food_webs, (list, tuple)):
+            self.collection, self.is_batch = FoodWebCollection(list(food_webs)), True
+        else:
+            self.collection, self.is_batch = FoodWebCollection([food_webs]), False
+        self._results = {}
+
+    def _get(self, name, compute):
+        '''Returns a result, it is computed on first use.'''
+        if name not in self._results:
+            self._results[name] = compute()
+        return self._results[name]
+
+    @property
+    def flows(self):
+        '''(k, n+3, n+3) flows with boundary.'''
+        def compute():
+            flows = self.collection.get_flow_matrix(boundary=True)
+            # sparse series return one matrix per snapshot, the analysis needs dense matrices
+            return flows if isinstance(flows, np.ndarray) else np.stack([x.toarray() for x in flows])
+        return self._get('flows', compute)
+
+    @property
+    def F(self):
+        '''(k, n, n) internal flows.'''
+        n = self.collection.mask.shape[1]
+        return self.flows[:, :n, :n]
+
+    @property
+    def T(self):
+        '''(k, n) node throughflows (internal inflows plus import).'''
+        n = self.collection.mask.shape[1]
+        return self._get('T', lambda: self.F.sum(axis=1) + self.flows[:, n, :n])
+
+    @property
+    def G(self):
+        '''(k, n, n) input-oriented flow structure matrix G_ij = F_ij / T_j.'''
+        def compute():
+            F, T = self.F, self.T
+            return np.divide(F, T[:, None, :], out=np.zeros_like(F), where=T[:, None, :] > 0.0)
+        return self._get('G', compute)
+
+    @property
+    def N(self):
+        '''(k, n, n) input-oriented integral flow matrix (I - G)^-1.'''
+        def compute():
+            I_G = np.identity(self.G.shape[1]) - self.G
+            try:
+                return np.linalg.inv(I_G)
+            except np.linalg.LinAlgError:
+                # some foodweb has a closed cycle without any outflow
+                return np.stack([np.linalg.pinv(x) for x in I_G])
+        return self._get('N', compute)
+
+
+def _as_analysis(food_webs):
+    '''Returns NetworkAnalysis of foodwebs, an analysis is returned as it is.'''
+    return food_webs if isinstance(food_webs, NetworkAnalysis) else NetworkAnalysis(food_webs)
+
+
+def calculate_throughflow(food_webs):
+    '''Calculates node throughflows: sums of internal inflows and imports.
+
+    Parameters
+    ----------
+    food_webs : foodwebs.FoodWeb, list of foodwebs.FoodWeb, FoodWebCollection or NetworkAnalysis
+
+    Returns
+    -------
+    throughflow : pd.Series or pd.DataFrame
+        Series indexed by nodes for a single foodweb, otherwise DataFrame
+        with foodwebs in rows and nodes in columns (NaN for missing nodes).
+    '''
+    analysis = _as_analysis(food_webs)
+    result = analysis.collection._to_frame(analysis.T)
+    return result if analysis.is_batch else result.iloc[0]
+
+
+def calculate_structure_matrices(food_web):
+    '''Calculates flow structure and integral flow (Leontief) matrices of a foodweb.
+
+    Parameters
+    ----------
+    food_web : foodwebs.FoodWeb or NetworkAnalysis of a single foodweb
+
+    Returns
+    -------
+    matrices : dict of pd.DataFrame
+        'G' - input-oriented structure matrix, fraction of node j throughflow coming from node i,
+        'N' - input-oriented integral flow matrix (I - G)^-1,
+        'G_output' - output-oriented structure matrix, fraction of node i throughflow going to node j,
+        'N_output' - output-oriented integral flow (Leontief) matrix (I - G_output)^-1.
+        The output-oriented matrices are obtained by rescaling, without additional inversion.
+    '''
+    analysis = _as_analysis(food_web)
+    collection = analysis.collection
+    T, G, N = analysis.T[0], analysis.G[0], analysis.N[0]
+
+    # G_output = D^-1 G D, where D = diag(T), so N_output = D^-1 N D
+    scale = np.divide(1.0, T, out=np.zeros_like(T), where=T > 0.0)
+    matrices = {'G': G,
+                'N': N,
+                'G_output': scale[:, None] * G * T[None, :],
+                'N_output': np.where(T[:, None] > 0.0, scale[:, None] * N * T[None, :], np.identity(len(T)))}
+    return {key: pd.DataFrame(value, index=collection.names, columns=collection.names)
+            for key, value in matrices.items()}
+
+
+def calculate_network_indices(food_webs):
+    '''Calculates ENA indices of foodwebs:
+        'TST' - total system throughput, sum of all flows including boundary flows,
+        'TSTp' - total system throughflow, sum of node throughflows,
+        'FCI' - Finn cycling index, fraction of TSTp that is cycled,
+        'APL' - average path length, TSTp divided by total import,
+        'Ascendency', 'DevelopmentCapacity' and 'Overhead' - information indices
+        (natural logarithm) computed over the flow matrix with boundary flows,
+        where Overhead = DevelopmentCapacity - Ascendency.
+
+    Parameters
+    ----------
+    food_webs : foodwebs.FoodWeb, list of foodwebs.FoodWeb, FoodWebCollection or NetworkAnalysis
+
+    Returns
+    -------
+    indices : pd.Series or pd.DataFrame
+        Series for a single foodweb, otherwise DataFrame with foodwebs in rows.
+    '''
+    analysis = _as_analysis(food_webs)
+    flows, T, N = analysis.flows, analysis.T, analysis.N
+
+    tst = flows.sum(axis=(1, 2))
+    tst_p = T.sum(axis=1)
+
+    # cycled throughflow: (N_jj - 1) / N_jj of node j throughflow
+    n_diagonal = np.diagonal(N, axis1=1, axis2=2)
+    cycled = np.divide(n_diagonal - 1.0, n_diagonal, out=np.zeros_like(n_diagonal), where=n_diagonal != 0.0)
+    fci = np.divide((cycled * T).sum(axis=1), tst_p, out=np.zeros_like(tst_p), where=tst_p > 0.0)
+
+    imports = flows[:, -3, :].sum(axis=1)
+    apl = np.divide(tst_p, imports, out=np.full_like(tst_p, np.nan), where=imports > 0.0)
+
+    # information indices, terms with zero flows are 0
+    outflows = flows.sum(axis=2)[:, :, None]
+    inflows = flows.sum(axis=1)[:, None, :]
+    has_flow = flows > 0.0
+    log_mutual = np.log(np.divide(flows * tst[:, None, None], outflows * inflows,
+                                  out=np.ones_like(flows), where=has_flow))
+    log_joint = np.log(np.divide(flows, tst[:, None, None], out=np.ones_like(flows), where=has_flow))
+    ascendency = (flows * log_mutual).sum(axis=(1, 2))
+    capacity = -(flows * log_joint).sum(axis=(1, 2))
+
+    indices = pd.DataFrame({'TST': tst,
+                            'TSTp': tst_p,
+                            'FCI': fci,
+                            'APL': apl,
+                            'Ascendency': ascendency,
+                            'DevelopmentCapacity': capacity,
+                            'Overhead': capacity - ascendency},
+                           index=analysis.collection.titles)
+    return indices if analysis.is_batch else indices.iloc[0]
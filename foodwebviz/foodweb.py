@@ -1,22 +1,36 @@
 '''Class for foodwebs.'''
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
 import networkx as nx
+import scipy.sparse as sp
 
 import foodwebviz as fw
-from .normalization import normalization_factory
+from .normalization import normalize_edge_weights, NORMALIZATION_METHODS
 
 
 __all__ = [
-    'FoodWeb'
+    'FoodWeb',
+    'FoodWebView'
 ]
 
 
+BOUNDARY_NODES = ['Import', 'Export', 'Respiration']
+
+GraphCacheInfo = namedtuple('GraphCacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
 class FoodWeb(object):
     '''
     Class defining a food web of an ecosystem.
     It stores species and flows between them with additional data like Biomass.
     '''
 
-    def __init__(self, title, node_df, flow_matrix):
+    # maximal number of graph views kept by get_graph
+    graph_cache_size = 32
+
+    def __init__(self, title, node_df, flow_matrix, sparse=False, eager=True, trophic_levels=None):
         '''Initialize a foodweb with title, nodes and flow matrix.
             Parameters
             ----------
@@ -25,42 +39,224 @@ class FoodWeb(object):
             node_df : pd.DataFrame
                 Species data respresented in a set of the following columns:
                 ['Names', 'IsAlive', 'Biomass', 'Import', 'Export', 'Respiration']
-            flow_matrix : pd.DataFrame
+            flow_matrix : pd.DataFrame, np.ndarray or scipy.sparse matrix
                 Data containing list of flows between species, adjacency matrix,
                 where the intersection between ith column and jth row represents
-                flow from node i to j.
+                flow from node i to j. Arrays and sparse matrices have to follow
+                the order of nodes in node_df.
+            sparse : bool, optional (default=False)
+                If True, flows are stored as scipy.sparse.csr_matrix and dense
+                matrices are built only when requested. Passing a sparse
+                flow_matrix implies sparse=True.
+            eager : bool, optional (default=True)
+                If False, trophic levels and the graph are computed on first access
+                (see node_df, trophic_levels and get_graph).
+            trophic_levels : array-like, optional (default=None)
+                Precomputed trophic levels in the order of nodes in node_df,
+                used instead of calculating them.
             See Also
             --------
             io.read_from_SCOR
         '''
         self.title = title
-        self.node_df = node_df.set_index("Names")
-        self.flow_matrix = flow_matrix
+        self._node_df = node_df.set_index("Names")
+        self.is_sparse = sparse or sp.issparse(flow_matrix)
+        self.eager = eager
+        self._flows = self._init_flows(flow_matrix)
+
+        self._graph_cache = OrderedDict()
+        self._graph_cache_hits = 0
+        self._graph_cache_misses = 0
+        self._update(trophic_levels)
+
+    def _update(self, trophic_levels=None):
+        '''Recomputes the state derived from nodes and flows and invalidates cached graphs.'''
+        self.node_index = {name: i for i, name in enumerate(self._node_df.index)}
+        self.n = len(self._node_df)
+        self.n_living = len(self._node_df[self._node_df.IsAlive])
+
+        self._trophic_levels_pending = self.n > 1
+        if trophic_levels is not None:
+            self._node_df['TrophicLevel'] = np.asarray(trophic_levels, dtype=float)
+            self._trophic_levels_pending = False
+        self._diet = None
+        self._flows_transposed = None
+        self.clear_graph_cache()
+
+        if self.eager:
+            self._init_trophic_levels()
+            self._nx_graph = self._init_graph()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # cached graph views cannot be pickled, they are rebuilt from weight layers on demand
+        state['_graph_cache'] = OrderedDict()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # read-only flags of shared arrays are lost by pickling (e.g. when sent between processes)
+        for name in ('_flows', '_boundary_matrix', '_diet'):
+            if isinstance(self.__dict__.get(name), np.ndarray):
+                self.__dict__[name].flags.writeable = False
+        for layer in self.__dict__.get('_weight_layers', {}).values():
+            for array in layer:
+                array.flags.writeable = False
+
+    def _init_trophic_levels(self):
+        '''Computes TrophicLevel column of node_df if it is not up to date.'''
+        if self._trophic_levels_pending:
+            # node_df is accessed during the computation, so the flag is cleared first
+            self._trophic_levels_pending = False
+            try:
+                self._node_df['TrophicLevel'] = fw.calculate_trophic_levels(self)
+            except Exception:
+                self._trophic_levels_pending = True
+                raise
+
+    @property
+    def node_df(self):
+        '''Node table (pd.DataFrame indexed by node names).
+
+        The TrophicLevel column is computed on first access if the foodweb is not eager.
+        Assigning a new table recomputes trophic levels and invalidates cached graphs.
+        After modifying the table in place, call clear_graph_cache().
+        '''
+        self._init_trophic_levels()
+        return self._node_df
 
-        self.n = len(self.node_df)
-        self.n_living = len(self.node_df[self.node_df.IsAlive])
+    @node_df.setter
+    def node_df(self, node_df):
+        self._node_df = node_df
+        self._update()
 
-        if len(flow_matrix) > 1:
-            self.node_df['TrophicLevel'] = fw.calculate_trophic_levels(self)
-        self._graph = self._init_graph()
+    @property
+    def trophic_levels(self):
+        '''Trophic levels of nodes (pd.Series), computed on first access if the foodweb is not eager.'''
+        return self.node_df['TrophicLevel']
+
+    @property
+    def _graph(self):
+        '''networkx.DiGraph with all flows, built on first access if the foodweb is not eager.'''
+        if self._nx_graph is None:
+            self._nx_graph = self._init_graph()
+        return self._nx_graph
+
+    @property
+    def _boundary_flows(self):
+        '''Flows extended by boundary nodes (see _init_boundary_flows), built on first access.'''
+        if self._boundary_matrix is None:
+            self._boundary_matrix = self._init_boundary_flows()
+        return self._boundary_matrix
+
+    def _init_flows(self, flow_matrix):
+        '''Returns flows as np.ndarray or scipy.sparse.csr_matrix ordered as node_df.
+        Empty (NaN) flows are replaced by 0 and their positions are kept in _nan_flows
+        for validation. Read-only arrays (e.g. memory-mapped) are used as they are.'''
+        self._nan_flows = (np.array([], dtype=int), np.array([], dtype=int))
+        if sp.issparse(flow_matrix):
+            flows = sp.csr_matrix(flow_matrix, dtype=float)
+            nan = np.isnan(flows.data) if flows.data.flags.writeable else False
+            if np.any(nan):
+                flows = flows.copy()
+                rows = np.repeat(np.arange(flows.shape[0]), np.diff(flows.indptr))
+                self._nan_flows = (rows[nan], flows.indices[nan])
+                flows.data[nan] = 0.0
+        else:
+            if isinstance(flow_matrix, pd.DataFrame):
+                flow_matrix = flow_matrix.reindex(index=self._node_df.index,
+                                                  columns=self._node_df.index, fill_value=0.0)
+            flows = np.asarray(flow_matrix, dtype=float)
+            if flows.flags.writeable:
+                # the storage is shared with the returned matrices, so it has to be read-only
+                flows = flows.copy()
+                nan = np.isnan(flows)
+                self._nan_flows = np.nonzero(nan)
+                flows[nan] = 0.0
+                flows.flags.writeable = False
+            if self.is_sparse:
+                flows = sp.csr_matrix(flows)
+
+        if flows.shape != (len(self._node_df), len(self._node_df)):
+            raise Exception('Flow matrix shape does not match the number of nodes.')
+        if self.is_sparse and not flows.data.all():
+            if not flows.data.flags.writeable:
+                # e.g. memory-mapped data
+                flows = flows.copy()
+            flows.eliminate_zeros()
+        return flows
+
+    @property
+    def flow_matrix(self):
+        '''Flow matrix as pd.DataFrame, a new copy is built on each access (see get_flow_matrix).'''
+        flows = self._flows.toarray() if self.is_sparse else self._flows.copy()
+        return pd.DataFrame(flows, index=self._node_df.index, columns=self._node_df.index, copy=False)
+
+    @flow_matrix.setter
+    def flow_matrix(self, flow_matrix):
+        self.is_sparse = self.is_sparse or sp.issparse(flow_matrix)
+        self._flows = self._init_flows(flow_matrix)
+        self._update()
+
+    def _get_node_names(self, boundary=False):
+        '''Returns an array of node names, optionally followed by boundary nodes.'''
+        names = self._node_df.index.values
+        return np.append(names, BOUNDARY_NODES).astype(object) if boundary else names.astype(object)
+
+    def _init_boundary_flows(self):
+        '''Returns (n+3)x(n+3) flow matrix extended by boundary nodes (Import, Export, Respiration).
+        Import is the last but two row, Export and Respiration are the last two columns.'''
+        n = self.n
+        imports, exports, respiration = (self._node_df[col].values.astype(float) for col in BOUNDARY_NODES)
+        if self.is_sparse:
+            flows = self._flows.tocoo()
+            nodes = np.arange(n)
+            flows = sp.csr_matrix(
+                (np.concatenate([flows.data, imports, exports, respiration]),
+                 (np.concatenate([flows.row, np.full(n, n), nodes, nodes]),
+                  np.concatenate([flows.col, nodes, np.full(n, n + 1), np.full(n, n + 2)]))),
+                shape=(n + 3, n + 3))
+            flows.eliminate_zeros()
+            return flows
+
+        flows = np.zeros((n + 3, n + 3))
+        flows[:n, :n] = self._flows
+        flows[n, :n] = imports
+        flows[:n, n + 1] = exports
+        flows[:n, n + 2] = respiration
+        flows.flags.writeable = False
+        return flows
 
     def _init_graph(self):
         '''Returns networkx.DiGraph initialized using foodweb's flow matrix.'''
-        graph = nx.from_pandas_adjacency(self.get_flow_matrix(boundary=True),  create_using=nx.DiGraph)
-        nx.set_node_attributes(graph, self.node_df.to_dict(orient='index'))
+        names = self._get_node_names(boundary=True)
+        flows = sp.coo_matrix(self._boundary_flows)
 
-        exclude_edges = []
-        for n in self.node_df.index.values:
-            exclude_edges.append((n, 'Import'))
-            exclude_edges.append(('Export', n))
-            exclude_edges.append(('Respiration', n))
-        graph.remove_edges_from(exclude_edges)
+        graph = nx.DiGraph()
+        graph.add_nodes_from(names)
+        graph.add_weighted_edges_from(zip(names[flows.row], names[flows.col], flows.data.tolist()))
+        nx.set_node_attributes(graph, self.node_df.to_dict(orient='index'))
         return graph
 
-    def get_diet_matrix(self):
+    def get_diet_matrix(self, as_frame=True):
         '''Returns a matrix of system flows express as diet proportions=
-        =fraction of node inflows this flow contributes'''
-        return self.flow_matrix.div(self.flow_matrix.sum(axis=0), axis=1).fillna(0.0)
+        =fraction of node inflows this flow contributes
+
+        Parameters
+        ----------
+        as_frame : bool, optional (default=True)
+            If False, np.ndarray or scipy.sparse.csr_matrix (in sparse mode) is returned.
+            It is computed once and shared, so it should not be modified.
+        '''
+        if self._diet is None:
+            inflows = np.asarray(self._flows.sum(axis=0)).ravel()
+            scale = np.divide(1.0, inflows, out=np.zeros_like(inflows), where=inflows != 0.0)
+            if self.is_sparse:
+                self._diet = (self._flows @ sp.diags(scale)).tocsr()
+            else:
+                self._diet = self._flows * scale
+                self._diet.flags.writeable = False
+        return self._as_frame(self._diet) if as_frame else self._diet
 
     def get_graph(self, boundary=False, mark_alive_nodes=False, normalization=None,
                   no_flows_to_detritus=False):
@@ -84,20 +280,101 @@ class FoodWeb(object):
         -------
         subgraph : networkx.SubGraph
             A read-only restricted view of networkx.DiGraph.
+            Graphs are cached (see graph_cache_info), so they should not be modified.
+            Normalized weights are taken from cached weight layers (see get_flow_weights).
         '''
-        exclude_nodes = [] if boundary else ['Import', 'Export', 'Respiration']
+        norm_type = normalization.lower() if normalization else None
+        key = (bool(boundary), bool(mark_alive_nodes),
+               None if norm_type == 'linear' else norm_type, bool(no_flows_to_detritus))
+        if key in self._graph_cache:
+            self._graph_cache_hits += 1
+            self._graph_cache.move_to_end(key)
+            return self._graph_cache[key]
+
+        self._graph_cache_misses += 1
+        g = nx.freeze(self._build_graph(boundary, mark_alive_nodes, normalization, no_flows_to_detritus))
+        self._graph_cache[key] = g
+        if len(self._graph_cache) > self.graph_cache_size:
+            self._graph_cache.popitem(last=False)
+        return g
+
+    def _build_graph(self, boundary, mark_alive_nodes, normalization, no_flows_to_detritus):
+        '''Returns a new graph view for get_graph parameters.'''
+        exclude_nodes = [] if boundary else BOUNDARY_NODES
+        names = self._get_node_names(boundary=True)
+        sources, targets, weights = self._get_weight_layer(boundary, normalization, no_flows_to_detritus)
 
-        exclude_edges = []
-        if no_flows_to_detritus:
-            not_alive_nodes = self.node_df[~self.node_df.IsAlive].index.values
-            exclude_edges = [edge for edge in self._graph.edges() if edge[1] in not_alive_nodes]
+        if weights is self._get_weight_layer(boundary, None, no_flows_to_detritus)[2]:
+            # flows are not normalized, so the view shares nodes and edges with the full graph
+            exclude_edges = []
+            if no_flows_to_detritus:
+                not_alive = np.flatnonzero(~self._node_df.IsAlive.values.astype(bool))
+                to_not_alive = sp.coo_matrix(self._boundary_flows[:, not_alive])
+                exclude_edges = zip(names[to_not_alive.row], names[not_alive[to_not_alive.col]])
+            g = nx.restricted_view(self._graph, exclude_nodes, exclude_edges)
+        else:
+            g = nx.DiGraph()
+            g.add_nodes_from((node, attrs) for node, attrs in self._graph.nodes(data=True)
+                             if node not in exclude_nodes)
+            g.add_weighted_edges_from(zip(names[sources], names[targets], weights.tolist()))
 
-        g = nx.restricted_view(self._graph.copy(), exclude_nodes, exclude_edges)
         if mark_alive_nodes:
             g = nx.relabel_nodes(g, fw.is_alive_mapping(self))
-        g = normalization_factory(g, norm_type=normalization)
         return g
 
+    def _get_weight_layer(self, boundary=False, normalization=None, no_flows_to_detritus=False):
+        '''Returns edges of a graph view as read-only arrays (sources, targets, weights),
+        sources and targets are positions in _get_node_names(boundary=True).
+        Each layer is computed once, until nodes or flows change.'''
+        norm_type = normalization.lower() if normalization else 'linear'
+        if norm_type not in NORMALIZATION_METHODS:
+            # as in normalization_factory, unknown methods leave flows unchanged
+            norm_type = 'linear'
+        key = (bool(boundary), norm_type, bool(no_flows_to_detritus))
+        if key in self._weight_layers:
+            return self._weight_layers[key]
+
+        if norm_type == 'linear':
+            flows = sp.coo_matrix(self._boundary_flows)
+            keep = np.ones(flows.nnz, dtype=bool)
+            if not boundary:
+                keep &= (flows.row < self.n) & (flows.col < self.n)
+            if no_flows_to_detritus:
+                is_alive = np.append(self._node_df.IsAlive.values.astype(bool), np.ones(len(BOUNDARY_NODES), bool))
+                keep &= is_alive[flows.col]
+            layer = (flows.row[keep], flows.col[keep], flows.data[keep])
+        else:
+            sources, targets, weights = self._get_weight_layer(boundary, None, no_flows_to_detritus)
+            biomass = np.append(self._node_df.Biomass.values.astype(float), np.full(len(BOUNDARY_NODES), np.nan))
+            layer = (sources, targets, normalize_edge_weights(sources, targets, weights, norm_type, biomass))
+
+        for array in layer:
+            array.flags.writeable = False
+        self._weight_layers[key] = layer
+        return layer
+
+    def graph_cache_info(self):
+        '''Returns statistics of the get_graph cache.
+
+        Returns
+        -------
+        info : GraphCacheInfo
+            Named tuple with hits, misses, maxsize and currsize fields.
+        '''
+        return GraphCacheInfo(self._graph_cache_hits, self._graph_cache_misses,
+                              self.graph_cache_size, len(self._graph_cache))
+
+    def clear_graph_cache(self):
+        '''Removes all graphs cached by get_graph and resets the statistics.
+        Boundary flows, weight layers and the graph are rebuilt from node_df,
+        so it has to be called after modifying node_df in place.'''
+        self._boundary_matrix = None
+        self._weight_layers = {}
+        self._nx_graph = None
+        self._graph_cache.clear()
+        self._graph_cache_hits = 0
+        self._graph_cache_misses = 0
+
     def get_flows(self, boundary=False, mark_alive_nodes=False, normalization=None,
                   no_flows_to_detritus=False):
         '''Returns a list of all flows within foodweb.
@@ -126,7 +403,39 @@ class FoodWeb(object):
         return (self.get_graph(boundary, mark_alive_nodes, normalization, no_flows_to_detritus)
                 .edges(data=True))
 
-    def get_flow_matrix(self, boundary=False, to_alive_only=False):
+    def get_flow_weights(self, boundary=False, mark_alive_nodes=False, normalization=None,
+                         no_flows_to_detritus=False):
+        '''Returns all flows within foodweb with their (normalized) weights, without building a graph.
+        Flows are in the same order as in get_flows.
+
+        Parameters
+        ----------
+        boundary : bool, optional (default=False)
+            If True, boundary flows will be added to the graph.
+            Boundary flows are: Import, Export, and Repiration.
+        mark_alive_nodes : bool, optional (default=False)
+            If True, nodes, which are not alive will have additional special sign near their name.
+        normalization : string, optional (default=None)
+            Defines method of graph edges normalization.
+            Available options are: 'diet', 'log', 'donor_control',
+            'predator_control', 'mixed_control', 'linear' and 'tst'.
+            Normalized weights are computed once and cached.
+        no_flows_to_detritus : bool, optional (default=False)
+            If True, fLows to detritus will be excluded from the results.
+
+        Returns
+        -------
+        flows : pd.DataFrame
+            Columns: 'From', 'To' and 'Weight'.
+        '''
+        sources, targets, weights = self._get_weight_layer(boundary, normalization, no_flows_to_detritus)
+        names = self._get_node_names(boundary=True)
+        if mark_alive_nodes:
+            mapping = fw.is_alive_mapping(self)
+            names = np.array([mapping.get(name, name) for name in names], dtype=object)
+        return pd.DataFrame({'From': names[sources], 'To': names[targets], 'Weight': weights})
+
+    def get_flow_matrix(self, boundary=False, to_alive_only=False, as_frame=True, copy=True):
         '''Returns the flow (adjacency) matrix.
 
         Parameters
@@ -137,44 +446,147 @@ class FoodWeb(object):
         to_alive_only : bool, optional (default=False)
             If True, flow_matrix will include only flows to alive nodes
             (flows to not alive nodes will be 0)
+        as_frame : bool, optional (default=True)
+            If False, np.ndarray or scipy.sparse.csr_matrix (in sparse mode) is returned,
+            rows/columns follow the order of node_df (and boundary nodes).
+            Without to_alive_only it is the foodweb's own storage, which should not be modified.
+        copy : bool, optional (default=True)
+            If False and the storage is dense, the returned DataFrame is a read-only view
+            of the foodweb's storage instead of a copy.
 
         Returns
         -------
         flows_matrix : pd.DataFrame
             Rows/columns are species, each row/column intersection represents flow
-            from ith to jth node.
+            from ith to jth node. Boundary flows are in the Import row
+            and in the Export and Respiration columns.
         '''
-        flow_matrix = self.flow_matrix.copy()
-
+        flows = self._boundary_flows if boundary else self._flows
         if to_alive_only:
-            flow_matrix.transpose()[~self.node_df['IsAlive']] = 0.0
-
-        if not boundary:
-            return flow_matrix
-
-        flow_matrix_with_boundary = self.flow_matrix.copy()
-        flow_matrix_with_boundary.loc['Import'] = self.node_df.Import.to_dict()
-        flow_matrix_with_boundary.loc['Export'] = self.node_df.Export.to_dict()
-        flow_matrix_with_boundary.loc['Respiration'] = self.node_df.Respiration.to_dict()
-        return (
-            flow_matrix_with_boundary
-            .join(self.node_df.Import)
-            .join(self.node_df.Export)
-            .join(self.node_df.Respiration)
-            .fillna(0.0))
+            alive = self._node_df['IsAlive'].values.astype(float)
+            if boundary:
+                alive = np.append(alive, np.ones(len(BOUNDARY_NODES)))
+            flows = flows @ sp.diags(alive, format='csr') if self.is_sparse else flows * alive
+        if not as_frame:
+            return flows
+        # flows restricted to alive nodes are already a new array
+        return self._as_frame(flows, boundary, copy=copy and not to_alive_only)
+
+    def _as_frame(self, flows, boundary=False, copy=True):
+        '''Wraps flows array (dense or sparse) in pd.DataFrame labeled with node names.
+        Dense arrays are copied unless copy is False.'''
+        names = pd.Index(self._get_node_names(boundary), name='Names')
+        if sp.issparse(flows):
+            flows = flows.toarray()
+        elif copy:
+            flows = flows.copy()
+        return pd.DataFrame(flows, index=names, columns=names, copy=False)
+
+    def to_arrow(self):
+        '''Returns nodes and flows as Arrow record batches (requires pyarrow),
+        e.g. for pyarrow.Table.from_batches, polars.from_arrow or DuckDB.
+
+        Numeric columns and sparse flows are shared with the foodweb without copying,
+        so the batches should not be modified.
+
+        Returns
+        -------
+        nodes : pyarrow.RecordBatch
+            Columns of node_df with node names in the 'Names' column,
+            the title of the foodweb is stored in the schema metadata under the key 'foodwebviz.title'.
+        flows : pyarrow.RecordBatch
+            One row per non-zero internal flow with columns 'From', 'To'
+            (node names dictionary encoded with indices of nodes in node_df) and 'Flow'.
+        '''
+        pa, _ = fw.io._import_pyarrow()
+        node_df = self.node_df
+        names = pa.array(node_df.index.values.astype(str))
+        nodes = pa.RecordBatch.from_arrays(
+            [names] + [pa.array(node_df[col].values) for col in node_df.columns],
+            names=['Names'] + list(node_df.columns),
+            metadata={b'foodwebviz.title': str(self.title).encode('utf-8')})
+
+        if self.is_sparse:
+            rows = np.repeat(np.arange(self.n, dtype=np.int32), np.diff(self._flows.indptr))
+            cols, data = self._flows.indices.astype(np.int32, copy=False), self._flows.data
+        else:
+            rows, cols = np.nonzero(self._flows)
+            rows, cols, data = rows.astype(np.int32), cols.astype(np.int32), self._flows[rows, cols]
+        flows = pa.RecordBatch.from_arrays(
+            [pa.DictionaryArray.from_arrays(pa.array(rows), names),
+             pa.DictionaryArray.from_arrays(pa.array(cols), names),
+             pa.array(data)],
+            names=['From', 'To', 'Flow'])
+        return nodes, flows
+
+    @staticmethod
+    def from_arrow(nodes, flows, title=None, sparse=False, eager=True):
+        '''Creates a foodweb from Arrow nodes and flows, see to_arrow.
+
+        Parameters
+        ----------
+        nodes : pyarrow.RecordBatch or pyarrow.Table
+            Node properties with columns 'Names', 'IsAlive', 'Biomass', 'Import', 'Export',
+            'Respiration' and optionally 'TrophicLevel' (used instead of calculating trophic levels).
+        flows : pyarrow.RecordBatch or pyarrow.Table
+            Flows with columns 'From', 'To' (node names, plain or dictionary encoded) and 'Flow'.
+        title : string, optional (default=None)
+            Name of the foodweb, by default it is read from the nodes schema metadata.
+        sparse : bool, optional (default=False)
+            If True, flows are stored in a sparse matrix.
+        eager : bool, optional (default=True)
+            If False, the graph is computed on first use.
+
+        Returns
+        -------
+        food_web : FoodWeb
+        '''
+        pa, _ = fw.io._import_pyarrow()
+        if title is None:
+            title = (nodes.schema.metadata or {}).get(b'foodwebviz.title', b'').decode('utf-8')
+        node_df = nodes.to_pandas()
+        names = pd.Index(node_df.Names)
+
+        def get_indices(column):
+            column = flows.column(column)
+            if isinstance(column, pa.ChunkedArray):
+                column = column.combine_chunks() if column.num_chunks else pa.array([], column.type)
+            if pa.types.is_dictionary(column.type):
+                # indices are kept if the dictionary follows the order of nodes
+                dictionary = names.get_indexer(column.dictionary.to_pandas())
+                indices = column.indices.to_numpy(zero_copy_only=False)
+                if np.array_equal(dictionary, np.arange(len(names))):
+                    return indices
+                return dictionary[indices]
+            return names.get_indexer(column.to_pandas())
+
+        rows, cols = get_indices('From'), get_indices('To')
+        data = flows.column('Flow').to_numpy()
+        if (rows < 0).any() or (cols < 0).any():
+            raise Exception('Flows table contains nodes missing in the nodes table.')
+        if (data < 0).any():
+            raise Exception('Flow matrix contains negative values.')
+
+        n = len(node_df)
+        flow_matrix = sp.csr_matrix((data, (rows, cols)), shape=(n, n))
+        return FoodWeb(title=title, node_df=node_df,
+                       flow_matrix=flow_matrix if sparse else flow_matrix.toarray(),
+                       sparse=sparse, eager=eager,
+                       trophic_levels=node_df.TrophicLevel.values if 'TrophicLevel' in node_df else None)
 
     def get_links_number(self):
         '''Returns the number of nonzero flows.
         '''
-        return self.get_graph(False).number_of_edges()
+        return len(self._get_weight_layer()[2])
 
     def get_flow_sum(self):
         '''Returns the sum of all flows.
         '''
-        return self.get_flow_matrix(boundary=True).sum()
+        return pd.Series(np.asarray(self._boundary_flows.sum(axis=0)).ravel(),
+                         index=self._get_node_names(boundary=True))
 
     def get_norm_node_prop(self):
-        num_node_prop = self.node_df[["Biomass", "Import", "Export", "Respiration"]]
+        num_node_prop = self._node_df[["Biomass", "Import", "Export", "Respiration"]]
         return num_node_prop.div(num_node_prop.sum(axis=0), axis=1)
 
     def __str__(self):
@@ -189,7 +601,162 @@ class FoodWeb(object):
                 {self.node_df["TrophicLevel"]}\n
                 '''
 
+    def subweb(self, nodes, include_neighbours=0):
+        '''Returns a view of the foodweb restricted to selected nodes.
+
+        Parameters
+        ----------
+        nodes : list of strings
+            Names of nodes to include.
+        include_neighbours : int, optional (default=0)
+            Number of steps along flows (in both directions) used to extend the selection,
+            e.g. 1 adds all prey and predators of selected nodes.
+
+        Returns
+        -------
+        subweb : FoodWebView
+            Foodweb with selected nodes and flows between them. Trophic levels
+            are taken from this foodweb. The cost is proportional to the number
+            of selected nodes and their flows, not to the size of the whole foodweb.
+        '''
+        selected = np.zeros(self.n, dtype=bool)
+        frontier = np.array([self.node_index[name] for name in nodes], dtype=int)
+        selected[frontier] = True
+
+        for _ in range(include_neighbours):
+            if self.is_sparse:
+                if self._flows_transposed is None:
+                    self._flows_transposed = self._flows.transpose().tocsr()
+                neighbours = np.concatenate([self._flows[frontier].indices,
+                                             self._flows_transposed[frontier].indices])
+            else:
+                neighbours = np.flatnonzero(self._flows[frontier].any(axis=0) |
+                                            self._flows[:, frontier].any(axis=1))
+            frontier = np.unique(neighbours[~selected[neighbours]])
+            if len(frontier) == 0:
+                break
+            selected[frontier] = True
+        return FoodWebView(self, np.flatnonzero(selected))
+
+    def aggregate(self, groups, bins=None):
+        '''Returns a smaller foodweb with nodes collapsed into groups.
+        Flows, biomass and boundary flows of nodes in a group are summed,
+        a group is alive if any of its nodes is alive. Living groups come first.
+
+        Parameters
+        ----------
+        groups : dict, pd.Series or string
+            Mapping of node names to group names (unmapped nodes are kept as they are),
+            'IsAlive' (groups 'Living' and 'Non-living') or 'TrophicLevel'
+            (living nodes binned by trophic level, non-living nodes in one group).
+        bins : int or sequence of scalars, optional (default=None)
+            Trophic level bins passed to pd.cut if groups='TrophicLevel'.
+            By default nodes are grouped by the integer part of their trophic level.
+
+        Returns
+        -------
+        food_web : FoodWeb
+        '''
+        labels = self._get_group_labels(groups, bins)
+        codes, names = pd.factorize(labels, sort=isinstance(labels, pd.Categorical))
+        is_alive = np.zeros(len(names), dtype=bool)
+        np.logical_or.at(is_alive, codes, self._node_df.IsAlive.values.astype(bool))
+
+        # living groups first
+        order = np.argsort(~is_alive, kind='stable')
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        codes, names, is_alive = rank[codes], np.asarray(names, dtype=object)[order], is_alive[order]
+
+        # indicator matrix of groups extended by boundary nodes, flows with
+        # boundary flows are summed in a single product G F G^T
+        g, n = len(names), self.n
+        G = sp.csr_matrix((np.ones(n + 3), (np.append(codes, np.arange(g, g + 3)), np.arange(n + 3))),
+                          shape=(g + 3, n + 3))
+        flows = sp.csr_matrix(G @ self._boundary_flows @ G.T)
+
+        node_df = pd.DataFrame({
+            'Names': names,
+            'IsAlive': is_alive,
+            'Biomass': G[:g, :n] @ self._node_df.Biomass.values.astype(float),
+            'Import': flows[g, :g].toarray().ravel(),
+            'Export': flows[:g, g + 1].toarray().ravel(),
+            'Respiration': flows[:g, g + 2].toarray().ravel()})
+        flows = flows[:g, :g]
+        return FoodWeb(title=self.title, node_df=node_df,
+                       flow_matrix=flows if self.is_sparse else flows.toarray(),
+                       sparse=self.is_sparse, eager=self.eager)
+
+    def _get_group_labels(self, groups, bins=None):
+        '''Returns group names of nodes, see aggregate.'''
+        is_alive = self._node_df.IsAlive.values.astype(bool)
+        if isinstance(groups, str):
+            if groups == 'IsAlive':
+                return np.where(is_alive, 'Living', 'Non-living').astype(object)
+            if groups == 'TrophicLevel':
+                trophic_levels = self.trophic_levels
+                if bins is None:
+                    levels = np.floor(trophic_levels.values).astype(int)
+                    categories = [f'TL {level}' for level in np.unique(levels)]
+                    levels = np.array([f'TL {level}' for level in levels], dtype=object)
+                else:
+                    levels = pd.cut(trophic_levels, bins, include_lowest=True)
+                    categories = [str(level) for level in levels.cat.categories]
+                    levels = levels.astype(str).values
+                # groups are ordered by trophic level
+                return pd.Categorical(np.where(is_alive, levels, 'Non-living'),
+                                      categories=categories + ['Non-living'])
+            raise Exception(f'Unknown grouping: {groups}.')
+
+        names = self._node_df.index.to_series()
+        return names.map(groups).fillna(names).values.astype(object)
+
     def get_outflows_to_living(self):
         # node's system outflows to living
         # TODO doc
-        return self.flow_matrix[self.node_df[self.node_df.IsAlive].index].sum(axis='columns')
+        return pd.Series(self._flows @ self._node_df.IsAlive.values.astype(float), index=self._node_df.index)
+
+
+class FoodWebView(FoodWeb):
+    '''
+    Food web restricted to a subset of nodes of a parent foodweb, see FoodWeb.subweb.
+    It supports the same accessors as FoodWeb, but it should be treated as read-only.
+    '''
+
+    def __init__(self, parent, index):
+        '''Initialize a view of parent foodweb.
+            Parameters
+            ----------
+            parent : FoodWeb
+                Foodweb to restrict.
+            index : np.ndarray
+                Positions of selected nodes in parent's node_df.
+        '''
+        self.parent = parent
+        self.index = np.asarray(index, dtype=int)
+        self.title = parent.title
+        self.is_sparse = parent.is_sparse
+        self.eager = False
+
+        # trophic levels are taken from the parent, they are not recomputed for the view
+        self._node_df = parent.node_df.iloc[self.index].copy()
+        if self.is_sparse:
+            self._flows = parent._flows[self.index][:, self.index]
+        else:
+            self._flows = parent._flows[np.ix_(self.index, self.index)]
+            self._flows.flags.writeable = False
+        # empty flows of the parent between selected nodes
+        position = np.full(parent.n, -1)
+        position[self.index] = np.arange(len(self.index))
+        rows, cols = (position[nodes] for nodes in parent._nan_flows)
+        keep = (rows >= 0) & (cols >= 0)
+        self._nan_flows = (rows[keep], cols[keep])
+
+        self._graph_cache = OrderedDict()
+        self._graph_cache_hits = 0
+        self._graph_cache_misses = 0
+        self._update()
+
+    def _init_trophic_levels(self):
+        '''Trophic levels of the view are the parent's trophic levels.'''
+        self._trophic_levels_pending = False
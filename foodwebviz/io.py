@@ -7,8 +7,23 @@ Create a foodweb from a SCOR file
 >>> food_web = read_from_SCOR(file_path)
 '''
 
+import io
+import os
+import bz2
+import glob
+import gzip
+import lzma
+import hashlib
+import inspect
+import zipfile
+import functools
+import itertools
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 import foodwebviz as fw
 
 
@@ -18,17 +33,208 @@ __all__ = [
     'write_to_CSV',
     'read_from_SCOR',
     'read_from_XLS',
-    'read_from_CSV'
+    'iter_from_XLS',
+    'read_from_CSV',
+    'write_to_npz',
+    'read_from_npz',
+    'write_to_parquet',
+    'read_from_parquet',
+    'read_many',
+    'iter_many',
+    'set_cache_options',
+    'clear_cache'
 ]
 
 
-def read_from_SCOR(scor_path):
+# on-disk cache of foodwebs read by read_from_SCOR, read_from_CSV and read_from_XLS,
+# see set_cache_options
+_CACHE = {
+    'enabled': os.environ.get('FOODWEBVIZ_CACHE', '1') != '0',
+    'directory': os.environ.get('FOODWEBVIZ_CACHE_DIR',
+                                os.path.join(os.path.expanduser('~'), '.cache', 'foodwebviz')),
+    'max_size': 2**30
+}
+
+# version of the cached files layout, part of the cache key
+_CACHE_FORMAT = 1
+
+# total size of cached files by cache directory, updated on writes, so the directory
+# is scanned only when the cache may exceed max_size
+_CACHE_SIZE = {}
+
+
+def set_cache_options(enabled=None, directory=None, max_size=None):
+    '''Configures the cache of read_from_SCOR, read_from_CSV and read_from_XLS.
+
+    Foodwebs are cached as .npz files (see write_to_npz) with trophic levels
+    (once they are computed), keyed by the content of the file, reader options and the package version.
+    Least recently used files are removed when the cache exceeds max_size.
+    The cache can also be disabled with environment variable FOODWEBVIZ_CACHE=0
+    and moved with FOODWEBVIZ_CACHE_DIR.
+
+    Parameters
+    ----------
+    enabled : bool, optional (default=None)
+        If False, files are always parsed.
+    directory : string, optional (default=None)
+        Cache directory, ~/.cache/foodwebviz by default.
+    max_size : int, optional (default=None)
+        Maximal size of the cache in bytes, 1 GiB by default.
+    '''
+    for option, value in [('enabled', enabled), ('directory', directory), ('max_size', max_size)]:
+        if value is not None:
+            _CACHE[option] = value
+
+
+def clear_cache():
+    '''Removes all cached foodwebs, see set_cache_options.'''
+    for path in glob.glob(os.path.join(_CACHE['directory'], '*.npz')):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    _CACHE_SIZE.pop(_CACHE['directory'], None)
+
+
+def _get_cache_key(path, reader, sparse):
+    '''Returns hash of the file content, reader, its options and the package version.'''
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(2**20), b''):
+            h.update(chunk)
+    h.update(f'{reader.__name__}|{sparse}|{fw.__version__}|{_CACHE_FORMAT}'.encode())
+    if reader.__name__ == 'read_from_CSV':
+        # title of the foodweb is the file name
+        h.update(str(path).encode())
+    return h.hexdigest()
+
+
+def _evict_cache():
+    '''Removes least recently used files until the cache fits into max_size,
+    returns the size of the remaining files.'''
+    files = []
+    for path in glob.glob(os.path.join(_CACHE['directory'], '*.npz')):
+        try:
+            files.append((os.path.getmtime(path), os.path.getsize(path), path))
+        except OSError:
+            pass
+    size = sum(f[1] for f in files)
+    for _, file_size, path in sorted(files):
+        if size <= _CACHE['max_size']:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        size -= file_size
+    return size
+
+
+def _write_cache(food_web, cache_path):
+    '''Writes a foodweb to the cache, failures are ignored (e.g. invalid data).'''
+    directory = _CACHE['directory']
+    # written under a temporary name, so other processes never read a partial file
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(directory, exist_ok=True)
+        write_to_npz(food_web, tmp_path)
+        size = os.path.getsize(tmp_path)
+        replaced_size = os.path.getsize(cache_path) if os.path.exists(cache_path) else 0
+        os.replace(tmp_path, cache_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return
+
+    if directory not in _CACHE_SIZE:
+        _CACHE_SIZE[directory] = _evict_cache()
+    else:
+        # a rewritten file (e.g. with trophic levels added) replaces its old size
+        _CACHE_SIZE[directory] += size - replaced_size
+        if _CACHE_SIZE[directory] > _CACHE['max_size']:
+            _CACHE_SIZE[directory] = _evict_cache()
+
+
+def _cached(reader):
+    '''Makes a read function use the on-disk cache, see set_cache_options.'''
+    signature = inspect.signature(reader)
+
+    @functools.wraps(reader)
+    def read(*args, **kwargs):
+        # arguments are bound by the reader's own parameter names (e.g. scor_path or filename)
+        arguments = signature.bind(*args, **kwargs)
+        arguments.apply_defaults()
+        path, sparse, eager = arguments.args
+        if not _CACHE['enabled'] or not isinstance(path, (str, os.PathLike)) or not os.path.isfile(path):
+            return reader(path, sparse=sparse, eager=eager)
+
+        cache_path = os.path.join(_CACHE['directory'], f'{_get_cache_key(path, reader, sparse)}.npz')
+        if os.path.exists(cache_path):
+            try:
+                # modification time marks the last use
+                os.utime(cache_path)
+                food_web = read_from_npz(cache_path, sparse=sparse, eager=False)
+            except Exception:
+                # broken or concurrently evicted file, it is parsed again
+                food_web = None
+            if food_web is not None:
+                if eager:
+                    missing = food_web._trophic_levels_pending
+                    food_web.eager = True
+                    food_web.node_df
+                    food_web._graph
+                    if missing:
+                        # the file was cached by a lazy read, trophic levels are added to it
+                        _write_cache(food_web, cache_path)
+                return food_web
+
+        food_web = reader(path, sparse=sparse, eager=eager)
+        _write_cache(food_web, cache_path)
+        return food_web
+    return read
+
+
+# number of flow lines read or written at once by read_from_SCOR and write_to_SCOR
+SCOR_CHUNK_SIZE = 2**16
+
+COMPRESSED_OPENERS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+
+@contextlib.contextmanager
+def _open_text(file, mode='r'):
+    '''Opens a path (plain, .gz, .bz2 or .xz) or wraps a file object as an UTF-8 text stream.
+    File objects are not closed.'''
+    if hasattr(file, 'read') or hasattr(file, 'write'):
+        if isinstance(file, io.TextIOBase):
+            yield file
+            return
+        text = io.TextIOWrapper(file, encoding='utf-8')
+        try:
+            yield text
+        finally:
+            text.flush()
+            text.detach()
+        return
+
+    opener = COMPRESSED_OPENERS.get(os.path.splitext(str(file))[1].lower())
+    with (opener(file, mode + 't', encoding='utf-8') if opener else
+          open(file, mode, encoding='utf-8')) as f:
+        yield f
+
+
+@_cached
+def read_from_SCOR(scor_path, sparse=False, eager=True):
     '''Reads a TXT file in the SCOR format and returns a FoodWeb object.
+    Parsed foodwebs are cached on disk, see set_cache_options.
 
     Parameters
     ----------
-    scor_path : string
-        Path to the foodweb in SCOR format.
+    scor_path : string or file object
+        Path to the foodweb in SCOR format, .gz, .bz2 and .xz files are decompressed.
+    sparse : bool, optional (default=False)
+        If True, flows are stored in a sparse matrix (see FoodWeb).
+    eager : bool, optional (default=True)
+        If False, trophic levels and the graph are computed on first use (see FoodWeb).
 
 
     Returns
@@ -84,7 +290,7 @@ def read_from_SCOR(scor_path):
 
 
     '''
-    with open(scor_path, 'r', encoding='utf-8') as f:
+    with _open_text(scor_path, 'r') as f:
         print(f'Reading file: {scor_path}')
         title = f.readline().strip()
         size = f.readline().split()
@@ -101,31 +307,49 @@ def read_from_SCOR(scor_path):
         if n <= 0 or n_living <= 0:
             raise Exception('Number of nodes and number of living nodes have to be positive integers.')
 
-        lines = [x.strip() for x in f.readlines()]
+        # names and four vector sections with separators
+        lines = [f.readline().strip() for _ in range(5 * n + 4)]
 
         net = pd.DataFrame(index=range(1, n+1))
         net['Names'] = lines[:n]
         net['IsAlive'] = [i < n_living for i in range(n)]
-        # reading vector input
+        # reading vector input, each line is 'node_number value'
         for i, col in enumerate(['Biomass', 'Import', 'Export', 'Respiration']):
             # each section should end with -1
-            if lines[(i + 1) * n + i + n] != '-1':
+            if lines[(i + 2) * n + i] != '-1':
                 raise Exception(f'Invalid SCOR file format. {col} section could be wrong, \
                                   the separator -1 could be in a wrong place, names list \
                                   could have wrong length.')
 
-            net[col] = [float(x.split(' ')[1])
-                        for x in lines[(i + 1) * n + i: (i + 2) * n + i]]
-        # reading the edge/flow list
-        flow_matrix = pd.DataFrame(index=range(1, n+1), columns=range(1, n+1))
-        for line in [x.split(' ') for x in lines[(i + 2) * n + i + 1:]]:
-            if line[0].strip() == '-1':
+            net[col] = _parse_numbers(lines[(i + 1) * n + i: (i + 2) * n + i], 2, col)[:, 1]
+
+        # reading the edge/flow list (lines 'from to flow' ended by -1) in chunks
+        chunks = []
+        for chunk in iter(lambda: [x.strip() for x in itertools.islice(f, SCOR_CHUNK_SIZE)], []):
+            if '-1' in chunk:
+                chunks.append(_parse_numbers(chunk[:chunk.index('-1')], 3, 'Flows'))
                 break
-            flow_matrix.at[int(line[0]), int(line[1])] = float(line[2])
-        flow_matrix = flow_matrix.fillna(0.0)
-        flow_matrix.index = net.Names
-        flow_matrix.columns = net.Names
-        return fw.FoodWeb(title=title, flow_matrix=flow_matrix, node_df=net)
+            chunks.append(_parse_numbers(chunk, 3, 'Flows'))
+        flows = np.concatenate(chunks) if chunks else np.zeros((0, 3))
+        rows, cols = flows[:, 0].astype(int) - 1, flows[:, 1].astype(int) - 1
+
+        # the last flow given for a pair of nodes is used
+        _, last = np.unique((rows * n + cols)[::-1], return_index=True)
+        last = len(rows) - 1 - last
+        flow_matrix = sp.csr_matrix((flows[last, 2], (rows[last], cols[last])), shape=(n, n))
+        if not sparse:
+            flow_matrix = pd.DataFrame(flow_matrix.toarray(), index=net.Names, columns=net.Names)
+        return fw.FoodWeb(title=title, flow_matrix=flow_matrix, node_df=net, sparse=sparse, eager=eager)
+
+
+def _parse_numbers(lines, n_columns, section):
+    '''Converts lines of whitespace separated numbers to array with n_columns columns at once.
+    Each line has to contain at least n_columns values, further values are ignored.'''
+    values = [line.split()[:n_columns] for line in lines]
+    if any(len(line) < n_columns for line in values):
+        raise Exception(f'Invalid SCOR file format. {section} section could be wrong, \
+                          each line should contain {n_columns} values.')
+    return np.array(values, dtype=float).reshape(-1, n_columns)
 
 
 def write_to_SCOR(food_web, scor_path):
@@ -135,8 +359,8 @@ def write_to_SCOR(food_web, scor_path):
     ----------
     foodweb : foodwebs.FoodWeb
         Object to save.
-    scor_path: string
-        Destination path.
+    scor_path: string or file object
+        Destination path, .gz, .bz2 and .xz files are compressed.
 
     See Also
     --------
@@ -192,49 +416,144 @@ def write_to_SCOR(food_web, scor_path):
         f.writelines([f'{i} {row}\n' for i, row in node_df[col].items()])
         f.write('-1\n')
 
-    with open(scor_path, 'w') as f:
+    with _open_text(scor_path, 'w') as f:
         f.write(f'{food_web.title}\n')
         f.write(f'{food_web.n} {food_web.n_living}\n')
         f.writelines([f'{x}\n' for x in food_web.node_df.index])
 
         node_df = food_web.node_df.reset_index().copy()
         node_df.index = node_df.index + 1
-        n_map = node_df.reset_index().set_index('Names')[['index']].to_dict()['index']
         for col in ['Biomass', 'Import', 'Export', 'Respiration']:
             write_col(node_df, f, col)
 
-        f.writelines(
-            [f'{n_map[edge[0]]} {n_map[edge[1]]} {edge[2]["weight"]}\n' for edge in food_web.get_flows()])
+        # flows are written from non-zero entries of the flow matrix in chunks
+        flows = sp.coo_matrix(food_web.get_flow_matrix(as_frame=False))
+        for start in range(0, flows.nnz, SCOR_CHUNK_SIZE):
+            chunk = slice(start, start + SCOR_CHUNK_SIZE)
+            np.savetxt(f, np.column_stack([flows.row[chunk] + 1, flows.col[chunk] + 1, flows.data[chunk]]),
+                       fmt='%d %d %s')
         f.write('-1\n')
         f.write('\n')
 
 
+XLS_SHEETS = ['Title', 'Node properties', 'Internal flows']
+
+
 def write_to_XLS(food_web, filename):
     '''Write foodweb as an XLS (spreadsheet) file.
 
     Parameters
     ----------
-    foodweb : foodwebs.FoodWeb
-        Object to save.
+    foodweb : foodwebs.FoodWeb or list of foodwebs.FoodWeb
+        Object to save. Several foodwebs are written as sheet groups,
+        sheet names of the i-th foodweb are prefixed with 'i ' (see read_from_XLS).
     filename: string
         Destination path.
     '''
-    writer = pd.ExcelWriter(filename)
-    pd.DataFrame([food_web.title]).to_excel(writer, sheet_name="Title")
-    food_web.node_df.to_excel(writer, sheet_name="Node properties")
-    food_web.flow_matrix.to_excel(writer, sheet_name="Internal flows")
-    writer.save()
+    food_webs = food_web if isinstance(food_web, (list, tuple)) else [food_web]
+    with pd.ExcelWriter(filename) as writer:
+        for i, web in enumerate(food_webs):
+            prefix = f'{i + 1} ' if len(food_webs) > 1 else ''
+            pd.DataFrame([web.title]).to_excel(writer, sheet_name=f'{prefix}Title')
+            web.node_df.to_excel(writer, sheet_name=f'{prefix}Node properties')
+            web.flow_matrix.to_excel(writer, sheet_name=f'{prefix}Internal flows')
+
+
+def _iter_sheets(filename):
+    '''Opens a workbook once and yields (sheet name, list of rows) for all sheets in order.
+    XLSX files are streamed in read-only mode.'''
+    if str(filename).lower().endswith('.xls'):
+        with pd.ExcelFile(filename) as book:
+            for name in book.sheet_names:
+                yield name, [tuple(row) for row in book.parse(name, header=None).values.tolist()]
+        return
+
+    import openpyxl
+    book = openpyxl.load_workbook(filename, read_only=True, data_only=True)
+    try:
+        for sheet in book.worksheets:
+            yield sheet.title, _trim_rows(sheet.iter_rows(values_only=True))
+    finally:
+        book.close()
+
+
+def _trim_rows(rows):
+    '''Removes trailing empty rows and columns, which read-only workbooks return for formatted empty cells.'''
+    rows = list(rows)
+    while rows and all(value is None for value in rows[-1]):
+        rows.pop()
+    width = max((max((i + 1 for i, value in enumerate(row) if value is not None), default=0) for row in rows),
+                default=0)
+    return [tuple(row[:width]) for row in rows]
+
+
+def _food_web_from_sheets(sheets, sparse=False, eager=True):
+    '''Builds a foodweb from rows of Title, Node properties and Internal flows sheets.'''
+    title, nodes, flows = (sheets[sheet] for sheet in XLS_SHEETS)
+
+    node_columns = ['Names', 'IsAlive', 'Biomass', 'Import', 'Export', 'Respiration']
+    node_df = pd.DataFrame(nodes[1:], columns=nodes[0])
+    missing = [col for col in node_columns if col not in node_df.columns]
+    if missing:
+        raise Exception(f'Node properties sheet is missing columns: {missing}.')
+    node_df = node_df[node_columns].astype({'Names': str, 'IsAlive': bool, 'Biomass': np.float64,
+                                            'Import': np.float64, 'Export': np.float64,
+                                            'Respiration': np.float64})
+
+    names = [row[0] for row in flows[1:]]
+    if flows[0][0] != 'Names' or list(flows[0][1:]) != names:
+        raise Exception('Flow matrix (Internal flows sheet) should have exactly same rows as columns.')
+    values = np.array([row[1:] for row in flows[1:]], dtype=float).reshape(len(names), len(names))
+    if (values < 0).any():
+        raise Exception('Flow matrix contains negative values.')
 
+    flow_matrix = pd.DataFrame(values, index=pd.Index(names).astype(str), columns=pd.Index(names).astype(str))
+    return fw.FoodWeb(title=title[1][1], node_df=node_df, flow_matrix=flow_matrix, sparse=sparse, eager=eager)
 
-def read_from_XLS(filename):
-    '''Read foodweb from an XLS (spreadsheet) file, see examples/data/Richards_Bay_C_Summer.xls.
+
+def iter_from_XLS(filename, sparse=False, eager=True):
+    '''Reads all foodwebs from an XLS (spreadsheet) workbook, see read_from_XLS.
+    The workbook is opened once and read sheet by sheet; each foodweb is yielded
+    as soon as all its sheets are read.
 
     Parameters
     ----------
+    filename: string
+        Path to the XLS or XLSX file.
+    sparse : bool, optional (default=False)
+        If True, flows are stored in a sparse matrix (see FoodWeb).
+    eager : bool, optional (default=True)
+        If False, trophic levels and the graph are computed on first use (see FoodWeb).
+
+    Yields
+    ------
     foodweb : foodwebs.FoodWeb
-        Object to save.
+        Foodwebs in the order of their sheet groups.
+    '''
+    groups = {}
+    for name, rows in _iter_sheets(filename):
+        sheet = next((sheet for sheet in XLS_SHEETS if name.endswith(sheet)), None)
+        if sheet is None:
+            continue
+        prefix = name[:-len(sheet)]
+        groups.setdefault(prefix, {})[sheet] = rows
+        if len(groups[prefix]) == len(XLS_SHEETS):
+            yield _food_web_from_sheets(groups.pop(prefix), sparse=sparse, eager=eager)
+
+
+@_cached
+def read_from_XLS(filename, sparse=False, eager=True):
+    '''Read foodweb from an XLS (spreadsheet) file, see examples/data/Richards_Bay_C_Summer.xls.
+    Parsed foodwebs are cached on disk, see set_cache_options.
+
+    Parameters
+    ----------
     filename: string
-        Destination path.
+        Path to the XLS or XLSX file.
+    sparse : bool, optional (default=False)
+        If True, flows are stored in a sparse matrix (see FoodWeb).
+    eager : bool, optional (default=True)
+        If False, trophic levels and the graph are computed on first use (see FoodWeb).
 
     Description
     ----------
@@ -248,29 +567,14 @@ def read_from_XLS(filename):
             with a table describing flows between the nodes in the system;
             the first row and the first column contain node names;
             table elements contain flow values from the node in the row to the node in the column.
-
+    A workbook can contain several foodwebs as sheet groups with common prefixes
+    (e.g. '1 Title', '1 Node properties', '1 Internal flows'), the first one is returned,
+    see iter_from_XLS.
     '''
-    title = pd.read_excel(filename, sheet_name='Title')
-    node_df = pd.read_excel(filename, sheet_name='Node properties',
-                            # will fail if any of those columns is missing
-                            usecols=['Names', 'IsAlive', 'Biomass', 'Import', 'Export', 'Respiration'],
-                            dtype={'Names': str,
-                                   'IsAlive': bool,
-                                   'Biomass': np.float64,
-                                   'Import': np.float64,
-                                   'Export': np.float64,
-                                   'Respiration': np.float64
-                                   })
-    flow_matrix = pd.read_excel(filename, sheet_name='Internal flows')
-    if not np.array_equal(flow_matrix.columns.values[1:], flow_matrix.Names.values):
-        raise Exception('Flow matrix (Internal flows sheet) should have exactly same rows as columns.')
-    names = flow_matrix.Names
-    flow_matrix.drop('Names', inplace=True, axis=1)
-    flow_matrix.index = names
-    flow_matrix.columns = names
-    if (flow_matrix < 0).any().any():
-        raise Exception('Flow matrix contains negative values.')
-    return fw.FoodWeb(title=title.values[0][1], node_df=node_df, flow_matrix=flow_matrix)
+    food_web = next(iter_from_XLS(filename, sparse=sparse, eager=eager), None)
+    if food_web is None:
+        raise Exception('Workbook should contain Title, Node properties and Internal flows sheets.')
+    return food_web
 
 
 def write_to_CSV(food_web, filename):
@@ -284,14 +588,19 @@ def write_to_CSV(food_web, filename):
         Destination path.
     '''
     data = food_web.flow_matrix
-    data = data.join(food_web.node_df[['IsAlive', 'Biomass', 'Export', 'Respiration', 'TrophicLevel']])
-    data = data.append(food_web.node_df.Import)
+    # IsAlive is written as 1/0 (see read_from_CSV)
+    data = data.join(food_web.node_df[['IsAlive', 'Biomass', 'Export', 'Respiration', 'TrophicLevel']]
+                     .astype({'IsAlive': int}))
+    data = pd.concat([data, food_web.node_df.Import.to_frame().T])
+    data.index.name = 'Names'
     data = data.fillna(0.0)
     data.to_csv(filename, sep=';', encoding='utf-8')
 
 
-def read_from_CSV(filename):
+@_cached
+def read_from_CSV(filename, sparse=False, eager=True):
     '''Reads a food web from a CSV (spreadsheet) file.
+    Parsed foodwebs are cached on disk, see set_cache_options.
 
     Parameters
     ----------
@@ -308,6 +617,10 @@ def read_from_CSV(filename):
 
         The field IsAlive is 1 for living and 0 for non-living(detrital) nodes.
         Import, Export and Respiration encode the respective flows crossing the ecosystem boundary.
+    sparse : bool, optional (default=False)
+        If True, flows are stored in a sparse matrix (see FoodWeb).
+    eager : bool, optional (default=True)
+        If False, trophic levels and the graph are computed on first use (see FoodWeb).
 
     Returns
     -------
@@ -346,4 +659,314 @@ def read_from_CSV(filename):
 
     return fw.FoodWeb(title=filename.split('.csv')[0],
                       node_df=node_df.reset_index(),
-                      flow_matrix=flow_matrix)
+                      flow_matrix=flow_matrix,
+                      sparse=sparse,
+                      eager=eager)
+
+
+def write_to_npz(food_web, filename):
+    '''Writes a food web with its trophic levels (if computed) to an uncompressed numpy .npz file,
+    which can be memory-mapped by read_from_npz.
+
+    Parameters
+    ----------
+    food_web : foodwebs.FoodWeb
+        Object to save.
+    filename: string
+        Destination path.
+
+    Description
+    ----------
+    The file contains typed arrays:
+        'title', 'names', 'is_alive', 'biomass', 'import', 'export', 'respiration',
+        'trophic_levels' (omitted if trophic levels are not computed yet), 'columns'
+        (order of node_df columns) and flows,
+        either 'flows' (dense n x n matrix) or 'data', 'indices', 'indptr' (CSR matrix).
+    '''
+    node_df = food_web._node_df
+    arrays = {
+        'title': np.array(food_web.title, dtype=str),
+        'names': node_df.index.values.astype(str),
+        'is_alive': node_df.IsAlive.values.astype(bool),
+        'biomass': node_df.Biomass.values.astype(float),
+        'import': node_df.Import.values.astype(float),
+        'export': node_df.Export.values.astype(float),
+        'respiration': node_df.Respiration.values.astype(float)
+    }
+    # trophic levels are stored only if they are already computed
+    if 'TrophicLevel' in node_df.columns and not food_web._trophic_levels_pending:
+        arrays['trophic_levels'] = node_df.TrophicLevel.values.astype(float)
+    arrays['columns'] = node_df.columns.values.astype(str)
+
+    flows = food_web.get_flow_matrix(as_frame=False)
+    if food_web.is_sparse:
+        arrays.update(data=flows.data, indices=flows.indices, indptr=flows.indptr)
+    else:
+        arrays['flows'] = np.ascontiguousarray(flows)
+
+    with open(filename, 'wb') as f:
+        np.savez(f, **arrays)
+
+
+def _load_npz(filename, mmap=True):
+    '''Returns arrays of an uncompressed .npz file as a dict,
+    arrays are memory-mapped at their offsets in the file if mmap is True.'''
+    if not mmap:
+        with np.load(filename) as npz:
+            return {name: npz[name] for name in npz.files}
+
+    arrays = {}
+    with zipfile.ZipFile(filename) as archive, open(filename, 'rb') as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise Exception('Compressed .npz files cannot be memory-mapped.')
+            # the local file header has fixed 30 bytes followed by file name and extra field
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = np.frombuffer(f.read(4), dtype='<u2')
+            f.seek(info.header_offset + 30 + int(name_length) + int(extra_length))
+
+            if np.lib.format.read_magic(f) == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            name = info.filename[:-len('.npy')]
+            if np.prod(shape) == 0:
+                arrays[name] = np.zeros(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(f, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                                         order='F' if fortran_order else 'C')
+    return arrays
+
+
+def read_from_npz(filename, sparse=None, eager=False, mmap=True):
+    '''Reads a food web written by write_to_npz.
+
+    Parameters
+    ----------
+    filename: string
+        Path to the .npz file.
+    sparse : bool, optional (default=None)
+        If True (False), flows are stored in a sparse (dense) matrix (see FoodWeb),
+        by default the storage of the saved foodweb is used.
+    eager : bool, optional (default=False)
+        If True, the graph is built while reading (see FoodWeb).
+        Trophic levels are read from the file, they are not recomputed.
+    mmap : bool, optional (default=True)
+        If True, flows are memory-mapped from the file instead of being copied,
+        so they are loaded on first use and the pages are shared by processes.
+
+    Returns
+    -------
+    foodwebs.FoodWeb object
+    '''
+    arrays = _load_npz(filename, mmap=mmap)
+    node_df = pd.DataFrame({
+        'Names': arrays['names'].astype(object),
+        'IsAlive': np.asarray(arrays['is_alive']),
+        'Biomass': np.asarray(arrays['biomass']),
+        'Import': np.asarray(arrays['import']),
+        'Export': np.asarray(arrays['export']),
+        'Respiration': np.asarray(arrays['respiration'])})
+    if 'trophic_levels' in arrays:
+        node_df['TrophicLevel'] = np.asarray(arrays['trophic_levels'])
+    if 'columns' in arrays:
+        # the column of trophic levels which are not computed yet keeps its position
+        node_df = node_df.reindex(columns=['Names'] + list(arrays['columns']))
+
+    n = len(node_df)
+    if 'flows' in arrays:
+        flow_matrix = arrays['flows']
+    else:
+        flow_matrix = sp.csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']), shape=(n, n))
+    if sparse is not None and sparse != sp.issparse(flow_matrix):
+        flow_matrix = sp.csr_matrix(flow_matrix) if sparse else flow_matrix.toarray()
+
+    return fw.FoodWeb(title=str(np.asarray(arrays['title'])[()]), node_df=node_df, flow_matrix=flow_matrix,
+                      sparse=sp.issparse(flow_matrix), eager=eager,
+                      trophic_levels=arrays.get('trophic_levels'))
+
+
+PARQUET_NODES = 'nodes.parquet'
+PARQUET_FLOWS = 'flows.parquet'
+
+
+def _import_pyarrow():
+    '''Returns pyarrow and pyarrow.parquet modules, pyarrow is an optional dependency.'''
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise Exception('Parquet and Arrow formats require pyarrow package (pip install foodwebviz[parquet]).')
+    return pyarrow, pyarrow.parquet
+
+
+def write_to_parquet(food_web, path):
+    '''Writes a food web as a directory with two Parquet tables: nodes and a long list of flows.
+    The size of the files grows with the number of flows, not with the square of number of nodes.
+
+    Parameters
+    ----------
+    food_web : foodwebs.FoodWeb
+        Object to save.
+    path: string
+        Destination directory, created if it does not exist.
+
+    Description
+    ----------
+    The directory contains:
+        'nodes.parquet':
+            table with columns 'Names' (string), 'IsAlive' (bool), 'Biomass', 'Import', 'Export',
+            'Respiration' and 'TrophicLevel' (float64); the title of the foodweb is stored
+            in the table metadata under the key 'foodwebviz.title'.
+        'flows.parquet':
+            table with columns 'From', 'To' (dictionary encoded node names) and 'Flow' (float64),
+            one row per non-zero flow.
+    '''
+    pa, pq = _import_pyarrow()
+    os.makedirs(path, exist_ok=True)
+
+    nodes, flows = food_web.to_arrow()
+    pq.write_table(pa.Table.from_batches([nodes]), os.path.join(path, PARQUET_NODES))
+    pq.write_table(pa.Table.from_batches([flows]), os.path.join(path, PARQUET_FLOWS))
+
+
+def read_from_parquet(path, sparse=False, eager=True):
+    '''Reads a food web written by write_to_parquet.
+
+    Parameters
+    ----------
+    path: string
+        Directory with 'nodes.parquet' and 'flows.parquet' files.
+    sparse : bool, optional (default=False)
+        If True, flows are stored in a sparse matrix (see FoodWeb).
+    eager : bool, optional (default=True)
+        If False, the graph is computed on first use (see FoodWeb).
+        Trophic levels are read from the nodes table if it contains them.
+
+    Returns
+    -------
+    foodwebs.FoodWeb object
+    '''
+    _, pq = _import_pyarrow()
+    return fw.FoodWeb.from_arrow(pq.read_table(os.path.join(path, PARQUET_NODES)),
+                                 pq.read_table(os.path.join(path, PARQUET_FLOWS)),
+                                 sparse=sparse, eager=eager)
+
+
+def _get_reader(path, format='auto'):
+    '''Returns the read function for a file format: 'SCOR', 'CSV', 'XLS', 'NPZ', 'PARQUET' or 'auto',
+    which recognizes the format by the file extension or a Parquet directory (SCOR is the default).'''
+    readers = {'scor': read_from_SCOR, 'csv': read_from_CSV, 'xls': read_from_XLS, 'npz': read_from_npz,
+               'parquet': read_from_parquet}
+    if format.lower() == 'auto' and _is_parquet_dir(path):
+        format = 'parquet'
+    elif format.lower() == 'auto':
+        root, extension = os.path.splitext(str(path))
+        if extension.lower() in COMPRESSED_OPENERS:
+            extension = os.path.splitext(root)[1]
+        extension = extension.lower()
+        format = {'.csv': 'csv', '.xls': 'xls', '.xlsx': 'xls', '.npz': 'npz'}.get(extension, 'scor')
+    if format.lower() not in readers:
+        raise Exception(f'Unknown foodweb format: {format}.')
+    return readers[format.lower()]
+
+
+def _is_parquet_dir(path):
+    '''Checks if path is a directory written by write_to_parquet.'''
+    return os.path.isfile(os.path.join(str(path), PARQUET_NODES))
+
+
+def _list_files(directory):
+    '''Returns sorted paths of all (not hidden) files and Parquet foodweb directories in a directory.'''
+    return [os.path.join(directory, f) for f in sorted(os.listdir(directory))
+            if not f.startswith('.') and (os.path.isfile(os.path.join(directory, f)) or
+                                          _is_parquet_dir(os.path.join(directory, f)))]
+
+
+def _read_file(task):
+    '''Reads one foodweb file, returns (path, food_web, error).'''
+    path, format, eager, kwargs = task
+    try:
+        food_web = _get_reader(path, format)(path, eager=False, **kwargs)
+        if eager:
+            # trophic levels are computed in the worker, the graph is built on first use
+            food_web.node_df
+            food_web.eager = True
+        return path, food_web, None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def iter_many(paths, workers=None, format='auto', eager=True, **kwargs):
+    '''Reads many foodweb files, yielding results as soon as they are ready.
+
+    Parameters
+    ----------
+    paths : string or list of strings
+        Directory with foodweb files or list of file paths.
+    workers : int, optional (default=None)
+        Number of processes; if None or 1, files are read in the current process.
+    format : string, optional (default='auto')
+        'SCOR', 'CSV', 'XLS', 'NPZ', 'PARQUET' or 'auto' (format recognized by file extension).
+    eager : bool, optional (default=True)
+        If True, trophic levels are computed while reading (in the worker processes).
+    kwargs
+        Additional arguments passed to the read function (e.g. sparse).
+
+    Yields
+    ------
+    path : string
+        Path of the file.
+    food_web : foodwebs.FoodWeb or None
+        Foodweb, None if the file could not be read.
+    error : string or None
+        Error message, None if the file was read.
+        With multiple workers, results are yielded in the order of completion.
+    '''
+    paths = _list_files(paths) if isinstance(paths, str) else list(paths)
+    tasks = [(path, format, eager, kwargs) for path in paths]
+    if workers is None or workers <= 1:
+        for task in tasks:
+            yield _read_file(task)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for future in as_completed([executor.submit(_read_file, task) for task in tasks]):
+            yield future.result()
+
+
+def read_many(paths, workers=None, format='auto', as_collection=False, eager=True, **kwargs):
+    '''Reads many foodweb files on a process pool, files which cannot be read are skipped.
+
+    Parameters
+    ----------
+    paths : string or list of strings
+        Directory with foodweb files or list of file paths.
+    workers : int, optional (default=None)
+        Number of processes; if None or 1, files are read in the current process.
+    format : string, optional (default='auto')
+        'SCOR', 'CSV', 'XLS', 'NPZ', 'PARQUET' or 'auto' (format recognized by file extension).
+    as_collection : bool, optional (default=False)
+        If True, foodwebs are returned as FoodWebCollection.
+    eager : bool, optional (default=True)
+        If True, trophic levels are computed while reading (in the worker processes).
+    kwargs
+        Additional arguments passed to the read function (e.g. sparse).
+
+    Returns
+    -------
+    food_webs : list of foodwebs.FoodWeb or FoodWebCollection
+        Foodwebs in the order of paths.
+    errors : dict
+        Error messages of files which could not be read, keyed by path.
+
+    See Also
+    --------
+    io.iter_many
+    '''
+    paths = _list_files(paths) if isinstance(paths, str) else list(paths)
+    results = {path: (food_web, error)
+               for path, food_web, error in iter_many(paths, workers, format, eager, **kwargs)}
+    food_webs = [results[path][0] for path in paths if results[path][1] is None]
+    errors = {path: results[path][1] for path in paths if results[path][1] is not None}
+    return fw.FoodWebCollection(food_webs) if as_collection else food_webs, errors
@@ -9,10 +9,83 @@ __all__ = [
     'donor_control_normalization',
     'predator_control_normalization',
     'mixed_control_normalization',
-    'tst_normalization'
+    'tst_normalization',
+    'normalize_edge_weights',
+    'normalize_flow_array'
 ]
 
 
+NORMALIZATION_METHODS = ['diet', 'log', 'donor_control', 'predator_control', 'mixed_control', 'tst']
+
+
+def normalize_edge_weights(sources, targets, weights, norm_type, biomass=None):
+    '''Normalizes weights of edges given as arrays, all edges are computed at once.
+    Sums needed by the methods (diet of nodes, TST) are computed over the given edges.
+
+    Parameters
+    ----------
+    sources, targets : np.ndarray
+        Integer indices of "from" and "to" nodes of edges.
+    weights : np.ndarray
+        Weights of edges.
+    norm_type : string
+        Represents normalization type to use. Available options are: 'diet', 'log',
+        'donor_control', 'predator_control', 'mixed_control', 'linear' and 'tst'.
+    biomass : np.ndarray, optional (default=None)
+        Biomass of nodes (indexed by sources and targets), required by
+        'donor_control', 'predator_control' and 'mixed_control'.
+
+    Returns
+    -------
+    weights : np.ndarray
+        Normalized weights aligned with the edges.
+    '''
+    weights = np.asarray(weights, dtype=float)
+    norm_type = norm_type.lower() if norm_type else 'linear'
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if norm_type == 'linear':
+            return weights.copy()
+        if norm_type == 'log':
+            return np.log10(weights)
+        if norm_type == 'diet':
+            n = max(np.max(targets, initial=-1) + 1, 0)
+            return weights / np.bincount(targets, weights, minlength=n)[targets]
+        if norm_type == 'tst':
+            return weights / weights.sum()
+
+        if biomass is None:
+            raise Exception(f'Biomass is required for {norm_type} normalization.')
+        biomass = np.asarray(biomass, dtype=float)
+        if norm_type == 'donor_control':
+            return weights / biomass[sources]
+        if norm_type == 'predator_control':
+            return weights / biomass[targets]
+        if norm_type == 'mixed_control':
+            return (weights / biomass[sources]) * (weights / biomass[targets])
+    raise Exception(f'Unknown normalization: {norm_type}.')
+
+
+def _normalize_graph(foodweb_graph_view, norm_type):
+    '''Normalizes weights of all edges of a graph in one pass, see normalize_edge_weights.
+    Nodes without Biomass attribute (boundary nodes) have NaN biomass.'''
+    node_index = {node: i for i, node in enumerate(foodweb_graph_view.nodes)}
+    edges = list(foodweb_graph_view.edges(data='weight'))
+    sources = np.fromiter((node_index[e[0]] for e in edges), dtype=int, count=len(edges))
+    targets = np.fromiter((node_index[e[1]] for e in edges), dtype=int, count=len(edges))
+    biomass = None
+    if norm_type in ('donor_control', 'predator_control', 'mixed_control'):
+        biomass = np.fromiter((b if b is not None else np.nan
+                               for b in dict(foodweb_graph_view.nodes(data='Biomass')).values()),
+                              dtype=float, count=len(node_index))
+
+    weights = normalize_edge_weights(sources, targets, np.array([e[2] for e in edges], dtype=float),
+                                     norm_type, biomass=biomass)
+    nx.set_edge_attributes(foodweb_graph_view, dict(zip(((e[0], e[1]) for e in edges), weights.tolist())),
+                           'weight')
+    return foodweb_graph_view
+
+
 def diet_normalization(foodweb_graph_view):
     '''In this normalization method, each weight is divided by node's diet.
     Diet is sum of all input weights, inlcuding external import.
@@ -27,13 +100,7 @@ def diet_normalization(foodweb_graph_view):
     subgraph : networkx.SubGraph
         Graph View representing normalized foodweb
     '''
-
-    def get_node_diet(node):
-        return sum([x[2] for x in foodweb_graph_view.in_edges(node, data='weight')])
-
-    nx.set_edge_attributes(foodweb_graph_view, {(e[0], e[1]): {'weight': e[2] / get_node_diet(e[1])}
-                                                for e in foodweb_graph_view.edges(data='weight')})
-    return foodweb_graph_view
+    return _normalize_graph(foodweb_graph_view, 'diet')
 
 
 def log_normalization(foodweb_graph_view):
@@ -49,9 +116,7 @@ def log_normalization(foodweb_graph_view):
     subgraph : networkx.SubGraph
         Graph View representing normalized foodweb
     '''
-    nx.set_edge_attributes(foodweb_graph_view, {(e[0], e[1]): {'weight': np.log10(e[2])}
-                                                for e in foodweb_graph_view.edges(data='weight')})
-    return foodweb_graph_view
+    return _normalize_graph(foodweb_graph_view, 'log')
 
 
 def donor_control_normalization(foodweb_graph_view):
@@ -67,10 +132,7 @@ def donor_control_normalization(foodweb_graph_view):
     subgraph : networkx.SubGraph
         Graph View representing normalized foodweb
     '''
-    biomass = nx.get_node_attributes(foodweb_graph_view, "Biomass")
-    nx.set_edge_attributes(foodweb_graph_view, {(e[0], e[1]): {'weight': e[2] / biomass[e[0]]}
-                                                for e in foodweb_graph_view.edges(data='weight')})
-    return foodweb_graph_view
+    return _normalize_graph(foodweb_graph_view, 'donor_control')
 
 
 def predator_control_normalization(foodweb_graph_view):
@@ -86,10 +148,7 @@ def predator_control_normalization(foodweb_graph_view):
     subgraph : networkx.SubGraph
         Graph View representing normalized foodweb
     '''
-    biomass = nx.get_node_attributes(foodweb_graph_view, "Biomass")
-    nx.set_edge_attributes(foodweb_graph_view, {(e[0], e[1]): {'weight': e[2] / biomass[e[1]]}
-                                                for e in foodweb_graph_view.edges(data='weight')})
-    return foodweb_graph_view
+    return _normalize_graph(foodweb_graph_view, 'predator_control')
 
 
 def mixed_control_normalization(foodweb_graph_view):
@@ -105,11 +164,7 @@ def mixed_control_normalization(foodweb_graph_view):
     subgraph : networkx.SubGraph
         Graph View representing normalized foodweb
     '''
-    biomass = nx.get_node_attributes(foodweb_graph_view, "Biomass")
-    nx.set_edge_attributes(foodweb_graph_view, {(e[0], e[1]):
-                                                {'weight': (e[2] / biomass[e[0]]) * (e[2] / biomass[e[1]])}
-                                                for e in foodweb_graph_view.edges(data='weight')})
-    return foodweb_graph_view
+    return _normalize_graph(foodweb_graph_view, 'mixed_control')
 
 
 def tst_normalization(foodweb_graph_view):
@@ -125,10 +180,57 @@ def tst_normalization(foodweb_graph_view):
     subgraph : networkx.SubGraph
         Graph View representing normalized foodweb
     '''
-    tst = sum([x[2] for x in foodweb_graph_view.edges(data='weight')])
-    nx.set_edge_attributes(foodweb_graph_view, {(e[0], e[1]): {'weight': e[2] / tst}
-                                                for e in foodweb_graph_view.edges(data='weight')})
-    return foodweb_graph_view
+    return _normalize_graph(foodweb_graph_view, 'tst')
+
+
+def normalize_flow_array(flows, norm_type, biomass=None):
+    '''Normalizes flow matrices stored in an array, e.g. a stack of (k, n, n) matrices
+    of several foodwebs. The methods correspond to normalization_factory,
+    but they are computed with array operations over the last two axes.
+
+    Parameters
+    ----------
+    flows : np.ndarray
+        Array of shape (..., n, n), flows[..., i, j] is the flow from node i to node j.
+    norm_type : string
+        Represents normalization type to use. Available options are: 'diet', 'log',
+        'donor_control', 'predator_control', 'mixed_control', 'linear' and 'tst'.
+    biomass : np.ndarray, optional (default=None)
+        Array of shape (..., n) with biomass of nodes, required by
+        'donor_control', 'predator_control' and 'mixed_control'.
+
+    Returns
+    -------
+    weights : np.ndarray
+        Array of the same shape as flows. Entries without a flow are 0,
+        except for 'log' normalization, where they are NaN.
+    '''
+    flows = np.asarray(flows, dtype=float)
+    norm_type = norm_type.lower() if norm_type else 'linear'
+    has_flow = flows != 0.0
+
+    def divide(x, y):
+        return np.divide(x, y, out=np.zeros(np.broadcast(x, y).shape), where=has_flow)
+
+    if norm_type == 'linear':
+        return flows.copy()
+    if norm_type == 'log':
+        return np.log10(flows, out=np.full(flows.shape, np.nan), where=has_flow)
+    if norm_type == 'diet':
+        return divide(flows, flows.sum(axis=-2, keepdims=True))
+    if norm_type == 'tst':
+        return divide(flows, flows.sum(axis=(-2, -1), keepdims=True))
+
+    if biomass is None:
+        raise Exception(f'Biomass is required for {norm_type} normalization.')
+    biomass = np.asarray(biomass, dtype=float)
+    if norm_type == 'donor_control':
+        return divide(flows, biomass[..., :, None])
+    if norm_type == 'predator_control':
+        return divide(flows, biomass[..., None, :])
+    if norm_type == 'mixed_control':
+        return divide(flows, biomass[..., :, None]) * divide(flows, biomass[..., None, :])
+    raise Exception(f'Unknown normalization: {norm_type}.')
 
 
 def normalization_factory(foodweb_graph_view, norm_type):
@@ -139,26 +241,15 @@ def normalization_factory(foodweb_graph_view, norm_type):
     foodweb_graph_view : networkx.SubGraph
         Graph View representing foodweb
     norm_type : string
-        Represents normalization type to use.
-        Available options are: 'diet', 'log', 'biomass', and 'tst'.
+        Represents normalization type to use. Available options are: 'diet', 'log',
+        'donor_control', 'predator_control', 'mixed_control', 'linear' and 'tst'.
+        Weights of all edges are computed at once, see normalize_edge_weights.
 
     Returns
     -------
     subgraph : networkx.SubGraph
         Graph View representing normalized foodweb
     '''
-    normalization_methods = {
-        'donor_control': donor_control_normalization,
-        'predator_control': predator_control_normalization,
-        'mixed_control': mixed_control_normalization,
-        'log': log_normalization,
-        'diet': diet_normalization,
-        'tst': tst_normalization
-    }
-
-    if norm_type == 'linear':
-        return foodweb_graph_view
-
-    if norm_type and norm_type.lower() in normalization_methods:
-        return normalization_methods[norm_type.lower()](foodweb_graph_view)
+    if norm_type and norm_type.lower() in NORMALIZATION_METHODS:
+        return _normalize_graph(foodweb_graph_view, norm_type.lower())
     return foodweb_graph_view
@@ -0,0 +1,223 @@
+'''What-if scenarios of flow changes and their effect on trophic levels.
+
+Trophic levels t solve M t = 1, where M = I - diag(free) A^T, A is the diet matrix
+and free marks nodes whose trophic level is not fixed to 1 (see utils.calculate_trophic_levels).
+A change of the flow from node i to node j changes only column j of the diet matrix,
+which is a single row of M. Updated trophic levels are obtained with the Sherman-Morrison
+formula from a cached LU factorization of M, so each edit costs one triangular solve.
+
+Examples
+--------
+
+Trophic levels after doubling one flow
+>>> scenario = TrophicLevelScenario(food_web)
+>>> scenario.apply(('A', 'B', 2 * food_web.flow_matrix.loc['A', 'B']))
+'''
+import numpy as np
+import pandas as pd
+import scipy.linalg
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+
+from .utils import solve_trophic_levels
+
+
+__all__ = [
+    'TrophicLevelScenario',
+    'calculate_scenarios'
+]
+
+
+class TrophicLevelScenario(object):
+    '''
+    Class computing trophic levels of a foodweb after single-flow edits
+    using rank-1 (Sherman-Morrison) updates of a cached factorization.
+    '''
+
+    def __init__(self, food_web, cumulative=False, max_updates=50, stability_tol=1e-8):
+        '''Initialize a scenario with a base foodweb.
+            Parameters
+            ----------
+            food_web : foodwebs.FoodWeb
+                Base foodweb, it is not modified.
+            cumulative : bool, optional (default=False)
+                If True, edits are applied one after another,
+                otherwise each edit is applied to the base foodweb.
+            max_updates : int, optional (default=50)
+                Number of accumulated rank-1 updates after which M is factorized again
+                (only if cumulative=True).
+            stability_tol : float, optional (default=1e-8)
+                If the Sherman-Morrison denominator is smaller than this value,
+                the update is unstable and the edited system is factorized instead.
+        '''
+        self.names = food_web.node_df.index
+        self.node_index = food_web.node_index
+        self.is_alive = food_web.node_df.IsAlive.values.astype(bool)
+        self.is_sparse = food_web.is_sparse
+        self.cumulative = cumulative
+        self.max_updates = max_updates
+        self.stability_tol = stability_tol
+
+        flows = food_web.get_flow_matrix(as_frame=False)
+        self._base_flows = flows.tocsc() if self.is_sparse else flows
+        self.trophic_levels = None
+        self.reset()
+
+    def reset(self):
+        '''Discards all applied edits (relevant in cumulative mode).'''
+        self._edits = {}
+        self._factorize()
+
+    def _column(self, j):
+        '''Returns current flows into node j as dense vector.'''
+        if self.is_sparse:
+            column = self._base_flows[:, j].toarray().ravel()
+        else:
+            column = self._base_flows[:, j].copy()
+        for i, value in self._edits.get(j, {}).items():
+            column[i] = value
+        return column
+
+    def _row(self, j, column):
+        '''Returns j-th row of M given flows into node j.'''
+        inflow = column.sum()
+        row = np.zeros(len(column))
+        if self.is_alive[j] and inflow > 0.0:
+            row = -column / inflow
+        row[j] += 1.0
+        return row
+
+    def _current_flows(self, edit=None):
+        '''Returns flows with all edits (and optionally one more (i, j, value) edit) applied.'''
+        edits = [(i, j, value) for j, column in self._edits.items() for i, value in column.items()]
+        if edit is not None:
+            edits.append(edit)
+        if not edits:
+            return self._base_flows
+        flows = self._base_flows.tolil() if self.is_sparse else self._base_flows.copy()
+        for i, j, value in edits:
+            flows[i, j] = value
+        return flows.tocsc() if self.is_sparse else flows
+
+    def _factorize(self):
+        '''Factorizes M for current flows and computes trophic levels, clears rank-1 updates.'''
+        flows = self._current_flows()
+        n = flows.shape[0]
+        inflow = np.asarray(flows.sum(axis=0)).ravel()
+        is_free = self.is_alive & (inflow > 0.0)
+        scale = np.divide(1.0, inflow, out=np.zeros(n), where=is_free)
+
+        # M = I - diag(free) A^T
+        self._updates = []
+        try:
+            if self.is_sparse:
+                self._lu = spla.splu((sp.identity(n, format='csc') - (flows @ sp.diags(scale)).T).tocsc())
+            else:
+                self._lu = scipy.linalg.lu_factor(np.identity(n) - (flows * scale).T, check_finite=False)
+                if np.any(np.diagonal(self._lu[0]) == 0.0):
+                    raise np.linalg.LinAlgError('Singular matrix')
+        except (RuntimeError, np.linalg.LinAlgError):
+            # singular system, trophic levels are computed with the pseudo-inverse fallback
+            self._lu = None
+        self.trophic_levels = (self._solve_base(np.ones(n)) if self._lu is not None
+                               else self._calculate_trophic_levels(flows))
+
+    def _calculate_trophic_levels(self, flows):
+        '''Calculates trophic levels from scratch as utils.calculate_trophic_levels.'''
+        return solve_trophic_levels(flows, self.is_alive)
+
+    def _solve_base(self, b):
+        '''Solves system with the factorized matrix.'''
+        if self.is_sparse:
+            return self._lu.solve(b)
+        return scipy.linalg.lu_solve(self._lu, b, check_finite=False)
+
+    def _solve(self, b):
+        '''Solves M x = b for current M, including accumulated rank-1 updates.'''
+        x = self._solve_base(b)
+        for w, u, denominator in self._updates:
+            x = x - w * (u @ x) / denominator
+        return x
+
+    def apply(self, edit):
+        '''Returns trophic levels after setting a flow.
+
+        Parameters
+        ----------
+        edit : tuple
+            (from_node, to_node, new_flow), node names as in food_web.node_df.
+
+        Returns
+        -------
+        trophic_levels : pd.Series
+        '''
+        from_node, to_node, value = edit
+        i, j = self.node_index[from_node], self.node_index[to_node]
+
+        column = self._column(j)
+        old_row = self._row(j, column)
+        column[i] = value
+        u = self._row(j, column) - old_row
+
+        if self._lu is None or (self.cumulative and len(self._updates) >= self.max_updates):
+            trophic_levels = self._refactorize(i, j, value)
+        else:
+            e_j = np.zeros(len(column))
+            e_j[j] = 1.0
+            w = self._solve(e_j)
+            denominator = 1.0 + u @ w
+            if abs(denominator) < self.stability_tol:
+                trophic_levels = self._refactorize(i, j, value)
+            else:
+                trophic_levels = self.trophic_levels - w * (u @ self.trophic_levels) / denominator
+                if self.cumulative:
+                    self._edits.setdefault(j, {})[i] = value
+                    self._updates.append((w, u, denominator))
+                    self.trophic_levels = trophic_levels
+        return pd.Series(trophic_levels, index=self.names, name='TrophicLevel')
+
+    def _refactorize(self, i, j, value):
+        '''Computes trophic levels of the edited system from scratch.'''
+        if self.cumulative:
+            self._edits.setdefault(j, {})[i] = value
+            self._factorize()
+            return self.trophic_levels
+        return self._calculate_trophic_levels(self._current_flows((i, j, value)))
+
+    def run(self, edits):
+        '''Returns trophic levels for each edit.
+
+        Parameters
+        ----------
+        edits : list of tuples
+            List of (from_node, to_node, new_flow) edits.
+
+        Returns
+        -------
+        trophic_levels : pd.DataFrame
+            Rows are edits, columns are nodes.
+        '''
+        return pd.DataFrame([self.apply(edit) for edit in edits],
+                            index=pd.MultiIndex.from_tuples([tuple(edit) for edit in edits],
+                                                            names=['From', 'To', 'Flow']))
+
+
+def calculate_scenarios(food_web, edits, cumulative=False):
+    '''Calculates trophic levels of a foodweb after single-flow edits,
+    see TrophicLevelScenario.
+
+    Parameters
+    ----------
+    food_web : foodwebs.FoodWeb
+        Base foodweb.
+    edits : list of tuples
+        List of (from_node, to_node, new_flow) edits.
+    cumulative : bool, optional (default=False)
+        If True, edits are applied one after another, otherwise each edit is applied to the base foodweb.
+
+    Returns
+    -------
+    trophic_levels : pd.DataFrame
+        Rows are edits, columns are nodes.
+    '''
+    return TrophicLevelScenario(food_web, cumulative=cumulative).run(edits)
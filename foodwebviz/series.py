@@ -0,0 +1,208 @@
+'''Class for time series of foodwebs.'''
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+import foodwebviz as fw
+from .collection import FoodWebCollection, NODE_PROPERTIES
+from .foodweb import BOUNDARY_NODES
+from .normalization import normalize_edge_weights
+from .utils import solve_trophic_levels
+
+
+__all__ = [
+    'FoodWebSeries'
+]
+
+
+class FoodWebSeries(FoodWebCollection):
+    '''
+    Class defining a series of snapshots of the same ecosystem, e.g. seasons or years.
+    All snapshots share one node index and flows are stored as a (time, n, n) tensor,
+    dense or as a list of sparse matrices. Trophic levels are solved step by step,
+    each solve starting from the trophic levels of the previous step.
+    '''
+
+    def __init__(self, food_webs, times=None, sparse=False):
+        '''Initialize a series from a list of foodwebs ordered in time.
+            Parameters
+            ----------
+            food_webs : list of foodwebs.FoodWeb
+                Snapshots of the foodweb. Nodes with the same name are aligned,
+                nodes missing in a snapshot are masked out.
+            times : list, optional (default=None)
+                Labels of snapshots (e.g. seasons), titles of foodwebs are used by default.
+            sparse : bool, optional (default=False)
+                If True, flows of each snapshot are stored as scipy.sparse.csr_matrix.
+
+            See Also
+            --------
+            collection.FoodWebCollection
+        '''
+        self.is_sparse = sparse
+        super().__init__(food_webs)
+        self.times = list(self.titles if times is None else times)
+        if len(self.times) != len(self.titles):
+            raise Exception('Number of times does not match the number of foodwebs.')
+        self._trophic_levels = None
+        self._frames = {}
+
+    def _init_flows(self, food_webs, indexers):
+        '''Returns flows aligned to names, as read-only (t, n, n) array or list of csr matrices.'''
+        if not self.is_sparse:
+            flows = super()._init_flows(food_webs, indexers)
+            flows.flags.writeable = False
+            return flows
+
+        n = len(self.names)
+        flows = []
+        for food_web, idx in zip(food_webs, indexers):
+            web_flows = sp.coo_matrix(food_web.get_flow_matrix(as_frame=False))
+            flows.append(sp.csr_matrix((web_flows.data, (idx[web_flows.row], idx[web_flows.col])),
+                                       shape=(n, n)))
+        return flows
+
+    @property
+    def flows(self):
+        '''Array of shape (t, n, n), flows[t, i, j] is the flow from node i to j at time t.
+        In sparse mode the dense array is built on each access, methods of the series
+        (e.g. get_flow_matrix or normalize) work on the sparse snapshots instead.'''
+        if self.is_sparse:
+            return np.stack([flows.toarray() for flows in self._flows])
+        return self._flows
+
+    def _get_index(self):
+        return self.times
+
+    def get_flow_matrix(self, boundary=False):
+        '''Returns flows of all snapshots, see FoodWebCollection.get_flow_matrix.
+        In sparse mode a list of scipy.sparse.csr_matrix, one per snapshot, is returned.'''
+        if not self.is_sparse:
+            return super().get_flow_matrix(boundary)
+        if not boundary:
+            return list(self._flows)
+
+        n = len(self.names)
+        nodes = np.arange(n)
+        matrices = []
+        for t, flows in enumerate(self._flows):
+            flows = flows.tocoo()
+            imports, exports, respiration = (self.node_properties[col][t] for col in BOUNDARY_NODES)
+            matrix = sp.csr_matrix(
+                (np.concatenate([flows.data, imports, exports, respiration]),
+                 (np.concatenate([flows.row, np.full(n, n), nodes, nodes]),
+                  np.concatenate([flows.col, nodes, np.full(n, n + 1), np.full(n, n + 2)]))),
+                shape=(n + 3, n + 3))
+            matrix.eliminate_zeros()
+            matrices.append(matrix)
+        return matrices
+
+    def get_diet_matrix(self):
+        '''Returns diet matrices of all snapshots, see FoodWebCollection.get_diet_matrix.
+        In sparse mode a list of scipy.sparse.csr_matrix, one per snapshot, is returned.'''
+        if not self.is_sparse:
+            return super().get_diet_matrix()
+        matrices = []
+        for flows in self._flows:
+            inflows = np.asarray(flows.sum(axis=0)).ravel()
+            scale = np.divide(1.0, inflows, out=np.zeros_like(inflows), where=inflows != 0.0)
+            matrices.append((flows @ sp.diags(scale)).tocsr())
+        return matrices
+
+    def _get_inflows(self):
+        if not self.is_sparse:
+            return super()._get_inflows()
+        return np.stack([np.asarray(flows.sum(axis=0)).ravel() for flows in self._flows])
+
+    def normalize(self, norm_type):
+        '''Returns normalized flows of all snapshots, see FoodWebCollection.normalize.
+        In sparse mode a list of scipy.sparse.csr_matrix, one per snapshot, is returned
+        and entries without a flow are not stored (also for 'log' normalization).'''
+        if not self.is_sparse:
+            return super().normalize(norm_type)
+        matrices = []
+        for t, flows in enumerate(self._flows):
+            flows = flows.tocoo()
+            weights = normalize_edge_weights(flows.row, flows.col, flows.data, norm_type,
+                                             biomass=self.node_properties['Biomass'][t])
+            matrices.append(sp.csr_matrix((weights, (flows.row, flows.col)), shape=flows.shape))
+        return matrices
+
+    def get_flow_matrix_at(self, t, as_frame=False):
+        '''Returns flows of t-th snapshot without copying the stored data.
+
+        Parameters
+        ----------
+        t : int
+            Position of the snapshot.
+        as_frame : bool, optional (default=False)
+            If True, flows are returned as pd.DataFrame indexed by names.
+
+        Returns
+        -------
+        flows : np.ndarray, scipy.sparse.csr_matrix or pd.DataFrame
+            Matrix of shape (n, n), flows of nodes missing at time t are 0.
+        '''
+        flows = self._flows[t]
+        if as_frame:
+            return pd.DataFrame(flows.toarray() if self.is_sparse else flows,
+                                index=self.names, columns=self.names)
+        return flows
+
+    def calculate_trophic_levels(self, solver='gmres', tol=1e-10, max_iter=1000):
+        '''Calculates trophic levels of nodes at all times, see utils.calculate_trophic_levels.
+        Iterative solvers start from the trophic levels of the previous snapshot,
+        which usually differ only slightly.
+
+        Parameters
+        ----------
+        solver : string, optional (default='gmres')
+            Method used to solve the systems: 'lu', 'gmres', 'jacobi' or 'pinv'
+            (see utils.solve_linear_system).
+        tol : float, optional (default=1e-10)
+            Relative residual tolerance of iterative solvers.
+        max_iter : int, optional (default=1000)
+            Maximal number of iterations of iterative solvers.
+
+        Returns
+        -------
+        trophic_levels : pd.DataFrame
+            Rows are times, columns are nodes, trophic levels of missing nodes are NaN.
+        '''
+        trophic_levels = np.zeros(self.mask.shape)
+        previous = None
+        for t, flows in enumerate(self._flows):
+            trophic_levels[t] = solve_trophic_levels(flows, self.is_alive[t], solver=solver, tol=tol,
+                                                     max_iter=max_iter, x0=previous)
+            previous = trophic_levels[t]
+
+        self._trophic_levels = self._to_frame(trophic_levels)
+        self._frames = {}
+        return self._trophic_levels
+
+    @property
+    def trophic_levels(self):
+        '''Trophic levels of nodes (pd.DataFrame, rows are times), computed on first access.'''
+        if self._trophic_levels is None:
+            self.calculate_trophic_levels()
+        return self._trophic_levels
+
+    def __getitem__(self, t):
+        '''Returns t-th snapshot as foodwebs.FoodWeb.
+        Snapshots are built once, share the trophic levels of the series and cache their graphs,
+        so plots can iterate over the series without rebuilding them.'''
+        if t not in self._frames:
+            self._frames[t] = self._build_frame(t)
+        return self._frames[t]
+
+    def _build_frame(self, t):
+        present = self.mask[t]
+        node_df = pd.DataFrame({'Names': self.names[present], 'IsAlive': self.is_alive[t, present]})
+        for col in NODE_PROPERTIES:
+            node_df[col] = self.node_properties[col][t, present]
+
+        flows = self._flows[t]
+        if not present.all():
+            flows = flows[present][:, present] if self.is_sparse else flows[np.ix_(present, present)]
+        return fw.FoodWeb(title=self.titles[t], node_df=node_df, flow_matrix=flows,
+                          eager=False, trophic_levels=self.trophic_levels.values[t, present])
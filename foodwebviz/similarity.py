@@ -0,0 +1,167 @@
+'''Structural (trophic) similarity of foodweb's nodes.
+
+Similarity of two nodes is the Jaccard index of their prey sets, predator sets
+or both (trophic similarity). All pairs are computed at once from the binary
+adjacency matrix B (B_ij = 1 if there is a flow from node i to node j):
+prey set overlaps are B^T B and predator set overlaps are B B^T.
+Products are sparse, so only pairs sharing at least one prey or predator are stored.
+
+Examples
+--------
+
+Find the most similar nodes and group nodes into 10 clusters
+>>> neighbours = get_most_similar(food_web, k=3)
+>>> clusters = cluster_nodes(food_web, n_clusters=10)
+>>> reduced = food_web.aggregate(clusters)
+'''
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.cluster import hierarchy
+from scipy.spatial.distance import squareform
+
+
+__all__ = [
+    'calculate_similarity',
+    'get_most_similar',
+    'calculate_linkage',
+    'cluster_nodes'
+]
+
+
+SIMILARITY_KINDS = ['prey', 'predator', 'trophic']
+
+
+def _get_adjacency(food_web):
+    '''Returns binary adjacency matrix of internal flows as scipy.sparse.csr_matrix.'''
+    flows = food_web.get_flow_matrix(as_frame=False)
+    return sp.csr_matrix(flows > 0.0, dtype=float)
+
+
+def calculate_similarity(food_web, kind='trophic', as_frame=True):
+    '''Calculates Jaccard similarity between all pairs of nodes.
+
+    Parameters
+    ----------
+    food_web : foodwebs.FoodWeb
+        Foodweb object.
+    kind : string, optional (default='trophic')
+        'prey' (overlap of prey sets), 'predator' (overlap of predator sets)
+        or 'trophic' (overlap of prey and predator sets together).
+    as_frame : bool, optional (default=True)
+        If False, similarity is returned as scipy.sparse.csr_matrix in the order of food_web.node_df.
+
+    Returns
+    -------
+    similarity : pd.DataFrame or scipy.sparse.csr_matrix
+        Square matrix of similarities, 0 for pairs without common prey or predators.
+    '''
+    if kind not in SIMILARITY_KINDS:
+        raise Exception(f'Unknown similarity kind: {kind}.')
+
+    B = _get_adjacency(food_web)
+    intersection = sp.csr_matrix(B.shape)
+    sizes = np.zeros(B.shape[0])
+    if kind in ('prey', 'trophic'):
+        intersection = intersection + B.T @ B
+        sizes += np.asarray(B.sum(axis=0)).ravel()
+    if kind in ('predator', 'trophic'):
+        intersection = intersection + B @ B.T
+        sizes += np.asarray(B.sum(axis=1)).ravel()
+
+    intersection = intersection.tocoo()
+    union = sizes[intersection.row] + sizes[intersection.col] - intersection.data
+    similarity = sp.csr_matrix((intersection.data / union, (intersection.row, intersection.col)),
+                               shape=intersection.shape)
+    if not as_frame:
+        return similarity
+    names = food_web.node_df.index
+    return pd.DataFrame(similarity.toarray(), index=names, columns=names)
+
+
+def get_most_similar(food_web, k=5, kind='trophic'):
+    '''Returns k most similar nodes of each node.
+
+    Parameters
+    ----------
+    food_web : foodwebs.FoodWeb
+        Foodweb object.
+    k : int, optional (default=5)
+        Number of neighbours per node.
+    kind : string, optional (default='trophic')
+        Similarity kind, see calculate_similarity.
+
+    Returns
+    -------
+    neighbours : pd.DataFrame
+        Columns: 'Node', 'Neighbour', 'Similarity', sorted by node and decreasing similarity.
+        Only neighbours with non-zero similarity are included.
+    '''
+    similarity = calculate_similarity(food_web, kind=kind, as_frame=False)
+    similarity.setdiag(0.0)
+    similarity.eliminate_zeros()
+    similarity = similarity.tocoo()
+
+    names = food_web.node_df.index.values
+    neighbours = pd.DataFrame({'node': similarity.row, 'neighbour': similarity.col, 'Similarity': similarity.data})
+    neighbours = neighbours.sort_values(['node', 'Similarity', 'neighbour'], ascending=[True, False, True],
+                                        kind='mergesort')
+    neighbours = neighbours.groupby('node', sort=False).head(k)
+    return pd.DataFrame({'Node': names[neighbours.node.values],
+                         'Neighbour': names[neighbours.neighbour.values],
+                         'Similarity': neighbours.Similarity.values})
+
+
+def calculate_linkage(food_web, kind='trophic', method='average'):
+    '''Hierarchical clustering of nodes with distance 1 - similarity.
+
+    Parameters
+    ----------
+    food_web : foodwebs.FoodWeb
+        Foodweb object.
+    kind : string, optional (default='trophic')
+        Similarity kind, see calculate_similarity.
+    method : string, optional (default='average')
+        Linkage method, see scipy.cluster.hierarchy.linkage.
+
+    Returns
+    -------
+    linkage : np.ndarray
+        Linkage matrix in the order of food_web.node_df,
+        can be passed to scipy.cluster.hierarchy.dendrogram.
+    '''
+    distance = 1.0 - calculate_similarity(food_web, kind=kind, as_frame=False).toarray()
+    np.fill_diagonal(distance, 0.0)
+    return hierarchy.linkage(squareform(distance, checks=False), method=method)
+
+
+def cluster_nodes(food_web, n_clusters=None, threshold=None, kind='trophic', method='average'):
+    '''Assigns nodes to clusters of structurally similar nodes.
+
+    Parameters
+    ----------
+    food_web : foodwebs.FoodWeb
+        Foodweb object.
+    n_clusters : int, optional (default=None)
+        Number of clusters.
+    threshold : float, optional (default=None)
+        Maximal distance (1 - similarity) within a cluster, used if n_clusters is not given.
+    kind : string, optional (default='trophic')
+        Similarity kind, see calculate_similarity.
+    method : string, optional (default='average')
+        Linkage method, see scipy.cluster.hierarchy.linkage.
+
+    Returns
+    -------
+    clusters : pd.Series
+        Cluster number of each node, can be passed to FoodWeb.aggregate.
+    '''
+    if n_clusters is None and threshold is None:
+        raise Exception('Either n_clusters or threshold has to be given.')
+
+    linkage = calculate_linkage(food_web, kind=kind, method=method)
+    if n_clusters is not None:
+        clusters = hierarchy.fcluster(linkage, n_clusters, criterion='maxclust')
+    else:
+        clusters = hierarchy.fcluster(linkage, threshold, criterion='distance')
+    return pd.Series(clusters, index=food_web.node_df.index, name='Cluster')
@@ -0,0 +1,317 @@
+'''Archive of many foodwebs in an embedded SQLite database.
+
+Nodes (with precomputed trophic levels) and non-zero flows of all foodwebs are
+stored in indexed tables, so queries across foodwebs do not need to read
+and parse the original files again.
+
+Examples
+--------
+
+Ingest a directory once and query flows into high trophic levels across all foodwebs
+>>> store = FoodWebStore('archive.db')
+>>> errors = store.ingest('data/', workers=4)
+>>> store.get_flows(min_flow=10.0, target_trophic_levels=(3.0, None))
+>>> food_web = store.get_foodweb('Richards Bay C Summer')
+'''
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+import foodwebviz as fw
+from .io import iter_many
+
+
+__all__ = [
+    'FoodWebStore'
+]
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS foodwebs (
+    id INTEGER PRIMARY KEY,
+    title TEXT,
+    path TEXT UNIQUE,
+    n INTEGER
+);
+CREATE TABLE IF NOT EXISTS nodes (
+    foodweb_id INTEGER REFERENCES foodwebs(id) ON DELETE CASCADE,
+    node_id INTEGER,
+    name TEXT,
+    is_alive INTEGER,
+    biomass REAL,
+    import REAL,
+    export REAL,
+    respiration REAL,
+    trophic_level REAL,
+    PRIMARY KEY (foodweb_id, node_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS flows (
+    foodweb_id INTEGER REFERENCES foodwebs(id) ON DELETE CASCADE,
+    source INTEGER,
+    target INTEGER,
+    flow REAL,
+    PRIMARY KEY (foodweb_id, source, target)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS foodwebs_title ON foodwebs (title);
+CREATE INDEX IF NOT EXISTS nodes_name ON nodes (name);
+CREATE INDEX IF NOT EXISTS nodes_trophic_level ON nodes (trophic_level);
+CREATE INDEX IF NOT EXISTS flows_target ON flows (foodweb_id, target);
+CREATE INDEX IF NOT EXISTS flows_flow ON flows (flow);
+'''
+
+# columns of nodes table and corresponding node_df columns
+NODE_COLUMNS = {'name': 'Names', 'is_alive': 'IsAlive', 'biomass': 'Biomass', 'import': 'Import',
+                'export': 'Export', 'respiration': 'Respiration', 'trophic_level': 'TrophicLevel'}
+
+
+class FoodWebStore(object):
+    '''
+    Class defining an archive of foodwebs in an SQLite database file.
+    Foodwebs are identified by their ids, titles or paths of the files they were ingested from.
+    '''
+
+    def __init__(self, path=':memory:'):
+        '''Opens (or creates) an archive.
+            Parameters
+            ----------
+            path : string, optional (default=':memory:')
+                Path to the database file, by default the archive is kept in memory.
+        '''
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.execute('PRAGMA foreign_keys = ON')
+        self._connection.executescript(SCHEMA)
+
+    def close(self):
+        '''Closes the database connection.'''
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self._connection.execute('SELECT COUNT(*) FROM foodwebs').fetchone()[0]
+
+    def add(self, food_web, path=None):
+        '''Adds a foodweb to the archive, computing its trophic levels if needed.
+
+        Parameters
+        ----------
+        food_web : foodwebs.FoodWeb
+            Foodweb to add.
+        path : string, optional (default=None)
+            Path of the source file, a foodweb previously added from the same path is replaced.
+
+        Returns
+        -------
+        id : int
+            Id of the foodweb in the archive.
+        '''
+        node_df = food_web.node_df.reindex(columns=list(NODE_COLUMNS.values())[1:])
+        flows = sp.coo_matrix(food_web.get_flow_matrix(as_frame=False))
+        nodes = zip(node_df.index.astype(str), node_df.IsAlive.values.astype(int).tolist(),
+                    *(node_df[col].values.astype(float).tolist() for col in node_df.columns[1:]))
+
+        with self._connection:
+            if path is not None:
+                self._connection.execute('DELETE FROM foodwebs WHERE path = ?', (path,))
+            foodweb_id = self._connection.execute(
+                'INSERT INTO foodwebs (title, path, n) VALUES (?, ?, ?)',
+                (str(food_web.title), path, food_web.n)).lastrowid
+            self._connection.executemany(
+                f'INSERT INTO nodes VALUES ({foodweb_id}, ?, ?, ?, ?, ?, ?, ?, ?)',
+                ((i, *node) for i, node in enumerate(nodes)))
+            self._connection.executemany(
+                f'INSERT INTO flows VALUES ({foodweb_id}, ?, ?, ?)',
+                zip(flows.row.tolist(), flows.col.tolist(), flows.data.tolist()))
+        return foodweb_id
+
+    def ingest(self, paths, workers=None, format='auto', **kwargs):
+        '''Reads foodweb files and adds them to the archive (see io.iter_many).
+
+        Parameters
+        ----------
+        paths : string or list of strings
+            Directory with foodweb files or list of file paths.
+        workers : int, optional (default=None)
+            Number of processes reading files and computing trophic levels.
+        format : string, optional (default='auto')
+            'SCOR', 'CSV', 'XLS', 'NPZ', 'PARQUET' or 'auto' (format recognized by file extension).
+        kwargs
+            Additional arguments passed to the read function.
+
+        Returns
+        -------
+        errors : dict
+            Error messages of files which could not be read or added, by path.
+        '''
+        errors = {}
+        for path, food_web, error in iter_many(paths, workers=workers, format=format, eager=True, **kwargs):
+            if error is None:
+                try:
+                    self.add(food_web, path=os.path.abspath(path))
+                except Exception as e:
+                    error = str(e)
+            if error is not None:
+                errors[path] = error
+        return errors
+
+    def remove(self, foodweb):
+        '''Removes a foodweb (id, title or path) from the archive.'''
+        with self._connection:
+            self._connection.execute('DELETE FROM foodwebs WHERE id = ?', (self._get_id(foodweb),))
+
+    @property
+    def foodwebs(self):
+        '''Archived foodwebs (pd.DataFrame indexed by id, with columns 'Title', 'Path' and 'Nodes').'''
+        return self.query('SELECT id, title AS Title, path AS Path, n AS Nodes FROM foodwebs ORDER BY id',
+                          index_col='id')
+
+    def query(self, sql, params=(), **kwargs):
+        '''Runs an SQL query, see the module SCHEMA for tables and columns.
+
+        Parameters
+        ----------
+        sql : string
+            SQL query.
+        params : sequence or dict, optional (default=())
+            Query parameters.
+        kwargs
+            Additional arguments passed to pd.read_sql_query.
+
+        Returns
+        -------
+        result : pd.DataFrame
+        '''
+        return pd.read_sql_query(sql, self._connection, params=params, **kwargs)
+
+    def _get_id(self, foodweb):
+        '''Returns id of a foodweb given by id, path or title.'''
+        if isinstance(foodweb, (int, np.integer)):
+            row = self._connection.execute('SELECT id FROM foodwebs WHERE id = ?', (int(foodweb),)).fetchone()
+        else:
+            row = self._connection.execute(
+                'SELECT id FROM foodwebs WHERE path IN (?, ?) OR title = ? ORDER BY path IN (?, ?) DESC, id',
+                (foodweb, os.path.abspath(foodweb), foodweb, foodweb, os.path.abspath(foodweb))).fetchone()
+        if row is None:
+            raise Exception(f'Foodweb {foodweb} is not in the archive.')
+        return row[0]
+
+    def _get_filters(self, foodwebs=None, **ranges):
+        '''Returns SQL conditions and parameters selecting foodwebs and value ranges.
+        Ranges are given as column=(min, max), None bounds are open.'''
+        conditions, params = [], []
+        if foodwebs is not None:
+            ids = [self._get_id(foodweb) for foodweb in foodwebs]
+            conditions.append(f'w.id IN ({", ".join("?" * len(ids))})')
+            params.extend(ids)
+        for column, (low, high) in ranges.items():
+            if low is not None:
+                conditions.append(f'{column} >= ?')
+                params.append(low)
+            if high is not None:
+                conditions.append(f'{column} <= ?')
+                params.append(high)
+        return ' AND '.join(conditions) or '1', params
+
+    def get_nodes(self, foodwebs=None, names=None, trophic_levels=None, is_alive=None):
+        '''Returns nodes of archived foodwebs.
+
+        Parameters
+        ----------
+        foodwebs : list, optional (default=None)
+            Ids, titles or paths of foodwebs, by default all foodwebs.
+        names : list of strings, optional (default=None)
+            Names of nodes, by default all nodes.
+        trophic_levels : tuple, optional (default=None)
+            (min, max) trophic level, None bounds are open.
+        is_alive : bool, optional (default=None)
+            If given, only living (True) or non-living (False) nodes are returned.
+
+        Returns
+        -------
+        nodes : pd.DataFrame
+            Columns: 'Foodweb' (title), 'Names', 'IsAlive', 'Biomass', 'Import', 'Export',
+            'Respiration' and 'TrophicLevel'.
+        '''
+        where, params = self._get_filters(foodwebs, **{'v.trophic_level': trophic_levels or (None, None)})
+        if names is not None:
+            where += f' AND v.name IN ({", ".join("?" * len(names))})'
+            params.extend(names)
+        if is_alive is not None:
+            where += ' AND v.is_alive = ?'
+            params.append(int(is_alive))
+        columns = ', '.join(f'v.{col} AS {name}' for col, name in NODE_COLUMNS.items())
+        nodes = self.query(f'''SELECT w.title AS Foodweb, {columns}
+                               FROM nodes v JOIN foodwebs w ON w.id = v.foodweb_id
+                               WHERE {where} ORDER BY v.foodweb_id, v.node_id''', params)
+        nodes['IsAlive'] = nodes.IsAlive.astype(bool)
+        return nodes
+
+    def get_flows(self, foodwebs=None, min_flow=None, max_flow=None,
+                  source_trophic_levels=None, target_trophic_levels=None):
+        '''Returns flows of archived foodwebs.
+
+        Parameters
+        ----------
+        foodwebs : list, optional (default=None)
+            Ids, titles or paths of foodwebs, by default all foodwebs.
+        min_flow, max_flow : float, optional (default=None)
+            Range of flow values.
+        source_trophic_levels, target_trophic_levels : tuple, optional (default=None)
+            (min, max) trophic level of the flow source/target, None bounds are open.
+
+        Returns
+        -------
+        flows : pd.DataFrame
+            Columns: 'Foodweb' (title), 'From', 'To', 'Flow', 'FromTrophicLevel' and 'ToTrophicLevel'.
+        '''
+        where, params = self._get_filters(foodwebs, **{
+            'f.flow': (min_flow, max_flow),
+            's.trophic_level': source_trophic_levels or (None, None),
+            't.trophic_level': target_trophic_levels or (None, None)})
+        return self.query(f'''SELECT w.title AS Foodweb, s.name AS "From", t.name AS "To", f.flow AS Flow,
+                                     s.trophic_level AS FromTrophicLevel, t.trophic_level AS ToTrophicLevel
+                              FROM flows f
+                              JOIN foodwebs w ON w.id = f.foodweb_id
+                              JOIN nodes s ON s.foodweb_id = f.foodweb_id AND s.node_id = f.source
+                              JOIN nodes t ON t.foodweb_id = f.foodweb_id AND t.node_id = f.target
+                              WHERE {where} ORDER BY f.foodweb_id, f.source, f.target''', params)
+
+    def get_foodweb(self, foodweb, sparse=False, eager=False):
+        '''Returns an archived foodweb, trophic levels are not recalculated.
+
+        Parameters
+        ----------
+        foodweb : int or string
+            Id, title or path of the foodweb.
+        sparse : bool, optional (default=False)
+            If True, flows are stored in a sparse matrix (see FoodWeb).
+        eager : bool, optional (default=False)
+            If True, the graph is built immediately (see FoodWeb).
+
+        Returns
+        -------
+        food_web : foodwebs.FoodWeb
+        '''
+        foodweb_id = self._get_id(foodweb)
+        title, n = self._connection.execute('SELECT title, n FROM foodwebs WHERE id = ?', (foodweb_id,)).fetchone()
+        node_df = self.query(f'''SELECT {', '.join(f'{col} AS {name}' for col, name in NODE_COLUMNS.items())}
+                                 FROM nodes WHERE foodweb_id = ? ORDER BY node_id''', (foodweb_id,))
+        node_df['IsAlive'] = node_df.IsAlive.astype(bool)
+        flows = np.array(self._connection.execute(
+            'SELECT source, target, flow FROM flows WHERE foodweb_id = ?', (foodweb_id,)).fetchall(),
+            dtype=float).reshape(-1, 3)
+        flow_matrix = sp.csr_matrix((flows[:, 2], (flows[:, 0].astype(int), flows[:, 1].astype(int))), shape=(n, n))
+
+        trophic_levels = node_df.pop('TrophicLevel').values.astype(float)
+        return fw.FoodWeb(title=title, node_df=node_df,
+                          flow_matrix=flow_matrix if sparse else flow_matrix.toarray(),
+                          sparse=sparse, eager=eager,
+                          trophic_levels=None if np.isnan(trophic_levels).any() else trophic_levels)
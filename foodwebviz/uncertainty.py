@@ -0,0 +1,151 @@
+'''Monte Carlo uncertainty analysis of flows and trophic levels.
+
+Flows of a foodweb are perturbed according to per-flow distributions
+and trophic levels and throughflows are computed for all draws.
+Draws are processed in chunks, so memory usage is bounded by the chunk size,
+and chunks may be distributed over a process pool.
+
+Examples
+--------
+
+5%, 50% and 95% quantiles of trophic levels from 1000 draws with 10% lognormal error
+>>> calculate_uncertainty(food_web, n_draws=1000, uncertainty=0.1)
+'''
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from .utils import batch_trophic_levels, solve_trophic_levels
+
+
+__all__ = [
+    'draw_flows',
+    'calculate_uncertainty'
+]
+
+
+def _get_uncertainty(uncertainty, food_web, rows, cols):
+    '''Returns per-flow uncertainty for nonzero flows (rows, cols).'''
+    if np.isscalar(uncertainty):
+        return np.full(len(rows), float(uncertainty))
+    if isinstance(uncertainty, pd.DataFrame):
+        uncertainty = uncertainty.reindex(index=food_web.node_df.index, columns=food_web.node_df.index).values
+    uncertainty = sp.csr_matrix(uncertainty) if sp.issparse(uncertainty) else np.asarray(uncertainty, dtype=float)
+    return np.asarray(uncertainty[rows, cols], dtype=float).ravel()
+
+
+def draw_flows(values, uncertainty, size, distribution='lognormal', rng=None):
+    '''Draws perturbed flow values.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Array of (nonzero) flow values.
+    uncertainty : np.ndarray or float
+        For 'lognormal' - standard deviation of the logarithm of the flow (the median is the flow),
+        for 'uniform' - relative half-width of the interval, e.g. 0.1 for +-10%.
+    size : int
+        Number of draws.
+    distribution : string, optional (default='lognormal')
+        'lognormal' or 'uniform'.
+    rng : np.random.Generator, optional (default=None)
+
+    Returns
+    -------
+    flows : np.ndarray
+        Array of shape (size, len(values)).
+    '''
+    rng = np.random.default_rng() if rng is None else rng
+    values = np.asarray(values, dtype=float)
+    if distribution == 'lognormal':
+        return values * rng.lognormal(0.0, uncertainty, size=(size, len(values)))
+    if distribution == 'uniform':
+        return values * rng.uniform(1.0 - np.asarray(uncertainty), 1.0 + np.asarray(uncertainty),
+                                    size=(size, len(values)))
+    raise Exception(f'Unknown distribution: {distribution}.')
+
+
+def _simulate_chunk(task):
+    '''Computes trophic levels and throughflows for one chunk of draws.'''
+    (rows, cols, values, uncertainty, imports, is_alive, distribution, size, seed, is_sparse) = task
+    n = len(is_alive)
+    rng = np.random.default_rng(seed)
+    flows = draw_flows(values, uncertainty, size, distribution, rng)
+
+    # throughflow = internal inflows + import, imports are perturbed with the same distribution
+    inflows = np.zeros((size, n))
+    np.add.at(inflows.T, cols, flows.T)
+    throughflow = inflows + draw_flows(imports, uncertainty.mean() if len(uncertainty) else 0.0,
+                                       size, distribution, rng)
+
+    if not is_sparse:
+        stack = np.zeros((size, n, n))
+        stack[:, rows, cols] = flows
+        return batch_trophic_levels(stack, is_alive), throughflow
+
+    trophic_levels = np.ones((size, n))
+    for d in range(size):
+        trophic_levels[d] = solve_trophic_levels(sp.csr_matrix((flows[d], (rows, cols)), shape=(n, n)),
+                                                 is_alive, inflow=inflows[d])
+    return trophic_levels, throughflow
+
+
+def calculate_uncertainty(food_web, n_draws=1000, uncertainty=0.1, distribution='lognormal',
+                          quantiles=(0.05, 0.5, 0.95), chunk_size=100, workers=None, seed=None):
+    '''Calculates distributions of trophic levels and throughflows of nodes
+    under random perturbations of flows.
+
+    Parameters
+    ----------
+    food_web : foodwebs.FoodWeb
+        Foodweb object.
+    n_draws : int, optional (default=1000)
+        Number of perturbed flow matrices.
+    uncertainty : float, np.ndarray, scipy.sparse matrix or pd.DataFrame, optional (default=0.1)
+        Uncertainty of flows (see draw_flows), a single value or a matrix
+        with per-flow values (in the shape of the flow matrix).
+        Imports are perturbed with the mean uncertainty.
+    distribution : string, optional (default='lognormal')
+        'lognormal' or 'uniform'.
+    quantiles : tuple of floats, optional (default=(0.05, 0.5, 0.95))
+        Quantiles to compute.
+    chunk_size : int, optional (default=100)
+        Number of draws computed together, for dense foodwebs the memory usage
+        is about chunk_size * n^2 floats.
+    workers : int, optional (default=None)
+        Number of processes; if None or 1, chunks are computed in the current process.
+    seed : int, optional (default=None)
+        Seed of the random generator, results do not depend on the number of workers.
+
+    Returns
+    -------
+    result : pd.DataFrame
+        Rows are nodes, columns are pairs (quantity, statistic), where quantity
+        is 'TrophicLevel' or 'Throughflow' and statistic is 'mean' or a quantile.
+    '''
+    flows = food_web.get_flow_matrix(as_frame=False)
+    flows = flows.tocoo() if food_web.is_sparse else sp.coo_matrix(flows)
+    rows, cols, values = flows.row, flows.col, flows.data
+    per_flow_uncertainty = _get_uncertainty(uncertainty, food_web, rows, cols)
+
+    sizes = [min(chunk_size, n_draws - start) for start in range(0, n_draws, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(rows, cols, values, per_flow_uncertainty, food_web.node_df.Import.values.astype(float),
+              food_web.node_df.IsAlive.values.astype(bool), distribution, size, chunk_seed, food_web.is_sparse)
+             for size, chunk_seed in zip(sizes, seeds)]
+
+    if workers is None or workers <= 1:
+        results = [_simulate_chunk(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_simulate_chunk, tasks))
+
+    data = {}
+    for name, draws in zip(['TrophicLevel', 'Throughflow'], zip(*results)):
+        draws = np.concatenate(draws)
+        data[(name, 'mean')] = draws.mean(axis=0)
+        for q, values in zip(quantiles, np.quantile(draws, quantiles, axis=0)):
+            data[(name, q)] = values
+    return pd.DataFrame(data, index=food_web.node_df.index)
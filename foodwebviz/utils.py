@@ -1,6 +1,7 @@
 '''Foodweb's utils methods.'''
 import numpy as np
-import pandas as pd
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
 
 
 __all__ = [
@@ -32,7 +33,108 @@ def squeeze_map(x, min_x, max_x, map_fun, min_out, max_out):
     return min_out + (max_out - min_out) * map_fun(x / min_x) / map_fun(max_x / min_x)
 
 
-def calculate_trophic_levels(food_web):
+def trophic_level_system(diet_matrix, is_fixed_to_one):
+    '''Returns the linear system M t = b for trophic levels of nodes not fixed to 1,
+    see calculate_trophic_levels.
+
+    Parameters
+    ----------
+    diet_matrix : np.ndarray or scipy.sparse matrix
+        Diet matrix of a foodweb, see FoodWeb.get_diet_matrix.
+    is_fixed_to_one : np.ndarray
+        Boolean mask of nodes with trophic level fixed to 1.
+
+    Returns
+    -------
+    M : np.ndarray or scipy.sparse.csc_matrix
+        Matrix I - A reduced to nodes not fixed to 1 (sparse if diet_matrix is sparse).
+    b : np.ndarray
+        Constants vector.
+    '''
+    # A_ij is the fraction of node i diet node j contributes
+    A = diet_matrix.transpose()
+    if sp.issparse(A):
+        A = A.tocsr()
+
+    is_free = ~is_fixed_to_one
+    # update the equation due to the prescribed trophic level 1 - reduce the dimension of the matrix
+    A_free = A[is_free][:, is_free]
+    if sp.issparse(A_free):
+        M = (sp.identity(A_free.shape[0], format='csc') - A_free).tocsc()
+    else:
+        M = np.identity(A_free.shape[0]) - A_free
+
+    # the constant 1 contribution and the diet fraction from non-living denoted as b
+    # in the function description
+    b = 1 + np.asarray(A[is_free][:, is_fixed_to_one].sum(axis=1)).ravel()
+    return M, b
+
+
+def solve_linear_system(M, b, solver='lu', tol=1e-10, max_iter=1000, x0=None):
+    '''Solves M x = b without forming the inverse of M.
+    If the system is singular or the iterative method does not converge,
+    the solution is computed with the pseudo-inverse of M.
+
+    Parameters
+    ----------
+    M : np.ndarray or scipy.sparse matrix
+        Square matrix of the system.
+    b : np.ndarray
+        Constants vector.
+    solver : string, optional (default='lu')
+        'lu' (LU decomposition, sparse if M is sparse), 'gmres', 'jacobi' or 'pinv'.
+    tol : float, optional (default=1e-10)
+        Relative residual tolerance of iterative solvers.
+    max_iter : int, optional (default=1000)
+        Maximal number of iterations of iterative solvers.
+    x0 : np.ndarray, optional (default=None)
+        Starting point of iterative solvers.
+
+    Returns
+    -------
+    x : np.ndarray
+    '''
+    if solver not in ('lu', 'gmres', 'jacobi', 'pinv'):
+        raise Exception(f'Unknown solver: {solver}.')
+
+    x = None
+    if solver == 'lu':
+        try:
+            x = spla.splu(sp.csc_matrix(M)).solve(b) if sp.issparse(M) else np.linalg.solve(M, b)
+        except (RuntimeError, np.linalg.LinAlgError):
+            # singular matrix
+            pass
+    elif solver == 'gmres':
+        try:
+            x, info = spla.gmres(M, b, x0=x0, rtol=tol, atol=0.0, maxiter=max_iter)
+        except TypeError:
+            # scipy < 1.12
+            x, info = spla.gmres(M, b, x0=x0, tol=tol, atol=0.0, maxiter=max_iter)
+        x = x if info == 0 else None
+    elif solver == 'jacobi':
+        x = _jacobi(M, b, tol, max_iter, x0)
+
+    if x is None or not np.all(np.isfinite(x)):
+        x = np.dot(np.linalg.pinv(M.toarray() if sp.issparse(M) else M), b)
+    return x
+
+
+def _jacobi(M, b, tol, max_iter, x0):
+    '''Jacobi iteration for M x = b, returns None if it does not converge.'''
+    diagonal = M.diagonal()
+    if np.any(diagonal == 0.0):
+        return None
+    R = M - (sp.diags(diagonal) if sp.issparse(M) else np.diag(diagonal))
+    x = np.array(x0, dtype=float) if x0 is not None else b / diagonal
+    b_norm = np.linalg.norm(b)
+    for _ in range(max_iter):
+        x = (b - R @ x) / diagonal
+        if np.linalg.norm(b - M @ x) <= tol * b_norm:
+            return x
+    return None
+
+
+def calculate_trophic_levels(food_web, solver='lu', tol=1e-10, max_iter=1000, x0=None):
     '''Calculate the fractional trophic levels of nodes using their the recursive
     relation. This implementation uses diet matrix to improve the numerical
     behavior of computation.
@@ -43,45 +145,115 @@ def calculate_trophic_levels(food_web):
     where A_ij is a matrix of a fraction of node i diet a living node j contributes
     b=sum_k A_ik for k = non-living nodes
 
+    The system (I - A) t = 1 + b is solved directly (sparse LU for sparse foodwebs)
+    or iteratively, the pseudo-inverse of I - A is used only for singular systems.
+
     Parameters
     ----------
     food web : foodwebs.FoodWeb
         Foodweb object.
+    solver : string, optional (default='lu')
+        Method used to solve the system: 'lu', 'gmres', 'jacobi' or 'pinv'
+        (see solve_linear_system).
+    tol : float, optional (default=1e-10)
+        Relative residual tolerance of iterative solvers.
+    max_iter : int, optional (default=1000)
+        Maximal number of iterations of iterative solvers.
+    x0 : np.ndarray, optional (default=None)
+        Initial guess of trophic levels (of all nodes) for iterative solvers.
 
     Returns
     -------
-    trophic_levels : list
-        List of trophic level values.
+    trophic_levels : np.ndarray
+        Array of trophic level values.
     '''
-    data_size = len(food_web.flow_matrix)
+    return solve_trophic_levels(food_web.get_flow_matrix(as_frame=False),
+                                food_web.node_df.IsAlive.values.astype(bool),
+                                diet=food_web.get_diet_matrix(as_frame=False),
+                                solver=solver, tol=tol, max_iter=max_iter, x0=x0)
 
-    # the diagonal has the sum of all incoming system flows to the compartment i,
-    # except flow from i to i
-    A = food_web.get_diet_matrix().transpose()
 
-    tl = pd.DataFrame(food_web.flow_matrix.sum(axis=0), columns=['inflow'])
+def solve_trophic_levels(flows, is_alive, inflow=None, diet=None, solver='lu', tol=1e-10, max_iter=1000,
+                         x0=None):
+    '''Calculates trophic levels of nodes from a flow matrix, see calculate_trophic_levels.
+
+    Parameters
+    ----------
+    flows : np.ndarray or scipy.sparse matrix
+        Square matrix, flows[i, j] is the flow from node i to node j.
+    is_alive : np.ndarray
+        Boolean array, non-living nodes have trophic level 1.
+    inflow : np.ndarray, optional (default=None)
+        Sums of internal inflows of nodes (column sums of flows), computed if not given.
+    diet : np.ndarray or scipy.sparse matrix, optional (default=None)
+        Diet matrix (flows divided by inflows of their targets), computed if not given.
+    solver, tol, max_iter, x0
+        See calculate_trophic_levels.
+
+    Returns
+    -------
+    trophic_levels : np.ndarray
+        Array of trophic level values.
+    '''
+    if inflow is None:
+        inflow = np.asarray(flows.sum(axis=0)).ravel()
     # here we identify nodes at trophic level 1
-    tl['is_fixed_to_one'] = (tl.inflow <= 0.0) | (np.arange(data_size) >= food_web.n_living)
-    tl['data_trophic_level'] = tl.is_fixed_to_one.astype(float)
+    is_fixed_to_one = (inflow <= 0.0) | ~is_alive
+    trophic_levels = is_fixed_to_one.astype(float)
 
     # counting the nodes with TL fixed to 1
-    if (sum(tl.is_fixed_to_one) != 0):
-        # update the equation due to the prescribed trophic level 1 - reduce the dimension of the matrix
-        A_tmp = A.loc[~tl['is_fixed_to_one'], ~tl['is_fixed_to_one']]
-        A_tmp = A_tmp*-1 + pd.DataFrame(np.identity(len(A_tmp)), index=A_tmp.index, columns=A_tmp.columns)
-
-        B = pd.DataFrame(tl[~tl.is_fixed_to_one].is_fixed_to_one.copy())
-        # filling the constants vector with ones - the constant 1 contribution
-        B['b'] = 1
-        # this is the diet fraction from non-living denoted as b in the function description
-        B['b'] = B['b'] + A.loc[~tl['is_fixed_to_one'], tl['is_fixed_to_one']].sum(axis=1)
-
-        A_inverse = np.linalg.pinv(A_tmp)
-        tl.loc[~tl['is_fixed_to_one'], 'data_trophic_level'] = np.dot(A_inverse, B['b'])
-    else:
-        # fails with negative trophic levels = some problems
-        np.linalg.pinv(A)
-    return tl.data_trophic_level.values
+    if is_fixed_to_one.any():
+        is_free = ~is_fixed_to_one
+        if diet is None:
+            scale = np.divide(1.0, inflow, out=np.zeros_like(inflow, dtype=float), where=inflow != 0.0)
+            diet = flows @ sp.diags(scale) if sp.issparse(flows) else flows * scale
+        M, b = trophic_level_system(diet, is_fixed_to_one)
+        trophic_levels[is_free] = solve_linear_system(M, b, solver=solver, tol=tol, max_iter=max_iter,
+                                                      x0=None if x0 is None else np.asarray(x0)[is_free])
+    # otherwise all trophic levels are undefined (left as 0) - some problems in the data
+    return trophic_levels
+
+
+def batch_trophic_levels(flows, is_alive):
+    '''Calculates trophic levels for a stack of flow matrices with a single batched solve,
+    see calculate_trophic_levels.
+
+    Nodes with trophic level fixed to 1 get the identity row in the system,
+    so all matrices share the shape (I - diag(free) A^T) t = 1.
+    If any system is singular, systems are solved one by one with the pseudo-inverse fallback.
+
+    Parameters
+    ----------
+    flows : np.ndarray
+        Array of shape (k, n, n), flows[w, i, j] is the flow from node i to node j.
+    is_alive : np.ndarray
+        Boolean array of shape (k, n) or (n,).
+
+    Returns
+    -------
+    trophic_levels : np.ndarray
+        Array of shape (k, n).
+    '''
+    k, n, _ = flows.shape
+    inflow = flows.sum(axis=1)
+    is_fixed_to_one = (inflow <= 0.0) | ~np.broadcast_to(is_alive, (k, n))
+    is_free = ~is_fixed_to_one
+
+    # diet matrices, A_ij is the fraction of node i diet node j contributes
+    diet = flows * np.divide(1.0, inflow, out=np.zeros_like(inflow), where=inflow > 0.0)[:, None, :]
+    M = np.identity(n) - is_free[:, :, None] * np.swapaxes(diet, 1, 2)
+
+    # systems without any node fixed to 1 have undefined trophic levels (left as 0)
+    solvable = is_fixed_to_one.any(axis=1)
+    trophic_levels = np.zeros((k, n))
+    try:
+        trophic_levels[solvable] = np.linalg.solve(M[solvable], np.ones((solvable.sum(), n, 1)))[..., 0]
+    except np.linalg.LinAlgError:
+        for w in np.flatnonzero(solvable):
+            M_free, b = trophic_level_system(diet[w], is_fixed_to_one[w])
+            trophic_levels[w] = 1.0
+            trophic_levels[w, is_free[w]] = solve_linear_system(M_free, b)
+    return trophic_levels
 
 
 def is_alive_mapping(food_web):
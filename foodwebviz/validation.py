@@ -0,0 +1,198 @@
+'''Validation of foodweb data.
+
+All checks are computed with array reductions over the non-zero flows of each foodweb
+(its own dense or sparse matrix), so foodwebs with different nodes can be validated together:
+    - 'nan_flow', 'negative_flow': invalid internal flows,
+    - 'nan_property', 'negative_property': invalid biomass or boundary flows,
+    - 'imbalance': node's inflow + import differs from outflow + export + respiration
+      by more than the relative tolerance,
+    - 'orphan': node without any internal inflow or outflow,
+    - 'read_error': file which could not be read (validate_directory only).
+
+Examples
+--------
+
+Validate all foodwebs in a directory before drawing them
+>>> report = validate_directory('data/')
+>>> report[report.Severity == 'error']
+'''
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from .collection import FoodWebCollection, NODE_PROPERTIES
+from .io import _get_reader, _list_files
+
+
+__all__ = [
+    'validate',
+    'validate_directory'
+]
+
+
+CHECK_SEVERITY = {
+    'read_error': 'error',
+    'nan_flow': 'error',
+    'negative_flow': 'error',
+    'nan_property': 'error',
+    'negative_property': 'error',
+    'imbalance': 'warning',
+    'orphan': 'warning'
+}
+
+REPORT_COLUMNS = ['Foodweb', 'Node', 'Target', 'Check', 'Severity', 'Value', 'Message']
+
+
+def _report(foodwebs, nodes, targets, check, values, message=''):
+    '''Returns report rows of one check.'''
+    return pd.DataFrame({
+        'Foodweb': foodwebs,
+        'Node': nodes,
+        'Target': targets,
+        'Check': check,
+        'Severity': CHECK_SEVERITY[check],
+        'Value': values,
+        'Message': message}, columns=REPORT_COLUMNS)
+
+
+def _validate_flows(title, names, rows, cols, values, nan_flows, properties, tol):
+    '''Returns report rows of one foodweb, given its flows in COO form (rows, cols, values),
+    positions of empty flows (rows, cols) and node properties.'''
+    n = len(names)
+    reports = []
+
+    internal = np.nan_to_num(values)
+    nan = np.isnan(values)
+    nan_rows, nan_cols = np.concatenate([rows[nan], nan_flows[0]]), np.concatenate([cols[nan], nan_flows[1]])
+    order = np.lexsort((nan_cols, nan_rows))
+    reports.append(_report(title, names[nan_rows[order]], names[nan_cols[order]], 'nan_flow', np.nan))
+    negative = values < 0.0
+    reports.append(_report(title, names[rows[negative]], names[cols[negative]], 'negative_flow', values[negative]))
+
+    for col in NODE_PROPERTIES:
+        prop = properties[col]
+        for check, invalid in [('nan_property', np.isnan(prop)), ('negative_property', prop < 0.0)]:
+            i = np.flatnonzero(invalid)
+            reports.append(_report(title, names[i], None, check, prop[i], col))
+
+    # mass-balance, invalid values are reported above
+    props = {col: np.nan_to_num(prop) for col, prop in properties.items()}
+    inflow = np.bincount(cols, weights=internal, minlength=n) + props['Import']
+    outflow = np.bincount(rows, weights=internal, minlength=n) + props['Export'] + props['Respiration']
+    scale = np.maximum(inflow, outflow)
+    imbalance = np.divide(inflow - outflow, scale, out=np.zeros_like(scale), where=scale > 0.0)
+    i = np.flatnonzero(np.abs(imbalance) > tol)
+    reports.append(_report(title, names[i], None, 'imbalance', imbalance[i]))
+
+    has_flows = np.zeros(n, dtype=bool)
+    has_flows[rows[internal != 0.0]] = True
+    has_flows[cols[internal != 0.0]] = True
+    i = np.flatnonzero(~has_flows)
+    reports.append(_report(title, names[i], None, 'orphan', 0.0))
+    return reports
+
+
+def _validate_food_web(food_web, tol):
+    '''Returns report rows of a foodweb, computed from its own (dense or sparse) flows.'''
+    names = food_web._node_df.index.values.astype(object)
+    flows = food_web.get_flow_matrix(as_frame=False)
+    if food_web.is_sparse:
+        flows = flows.tocoo()
+        rows, cols, values = flows.row, flows.col, flows.data
+    else:
+        rows, cols = np.nonzero(flows)
+        values = flows[rows, cols]
+    properties = {col: food_web._node_df[col].values.astype(float) for col in NODE_PROPERTIES}
+    return _validate_flows(food_web.title, names, rows, cols, values, food_web._nan_flows, properties, tol)
+
+
+def _validate_collection(collection, tol):
+    '''Returns report rows of all foodwebs of a collection, each restricted to its nodes.'''
+    reports = []
+    empty = (np.array([], dtype=int), np.array([], dtype=int))
+    # stacked array or list of sparse matrices (sparse series)
+    all_flows = collection.get_flow_matrix()
+    for w, title in enumerate(collection.titles):
+        present = collection.mask[w]
+        if sp.issparse(all_flows[w]):
+            flows = all_flows[w][present][:, present].tocoo()
+            rows, cols, values = flows.row, flows.col, flows.data
+        else:
+            flows = all_flows[w][np.ix_(present, present)]
+            rows, cols = np.nonzero(flows)
+            values = flows[rows, cols]
+        properties = {col: prop[w, present] for col, prop in collection.node_properties.items()}
+        reports.extend(_validate_flows(title, collection.names.values[present].astype(object),
+                                       rows, cols, values, empty, properties, tol))
+    return reports
+
+
+def validate(food_webs, tol=0.05):
+    '''Validates foodwebs, see the module description for the list of checks.
+
+    Parameters
+    ----------
+    food_webs : foodwebs.FoodWeb, list of foodwebs.FoodWeb or FoodWebCollection
+        Foodwebs to validate.
+    tol : float, optional (default=0.05)
+        Relative tolerance of mass-balance, imbalance of a node is divided
+        by the larger of its total inflow and total outflow.
+
+    Returns
+    -------
+    report : pd.DataFrame
+        One row per issue with columns: 'Foodweb' (title), 'Node', 'Target' (flow target),
+        'Check', 'Severity' ('error' or 'warning'), 'Value' (invalid value or relative imbalance)
+        and 'Message' (name of invalid property). Empty if no issues were found.
+    '''
+    if isinstance(food_webs, FoodWebCollection):
+        titles = food_webs.titles
+        reports = _validate_collection(food_webs, tol)
+    else:
+        food_webs = list(food_webs) if isinstance(food_webs, (list, tuple)) else [food_webs]
+        titles = [food_web.title for food_web in food_webs]
+        reports = [report for food_web in food_webs for report in _validate_food_web(food_web, tol)]
+
+    report = pd.concat(reports, ignore_index=True) if reports else _report([], None, None, 'orphan', [])
+    # order of foodwebs, then order of checks
+    report['_order'] = pd.Categorical(report.Foodweb, categories=pd.unique(np.array(titles, dtype=object))).codes
+    return report.sort_values('_order', kind='mergesort').drop(columns='_order').reset_index(drop=True)
+
+
+def validate_directory(directory, format='auto', tol=0.05, **kwargs):
+    '''Reads and validates all foodweb files from a directory.
+    Files are read without computing trophic levels, files which
+    cannot be read are reported as 'read_error'.
+
+    Parameters
+    ----------
+    directory : string
+        Path to the directory.
+    format : string, optional (default='auto')
+        'SCOR', 'CSV', 'XLS', 'NPZ', 'PARQUET' or 'auto' (format recognized by file extension).
+    tol : float, optional (default=0.05)
+        Relative tolerance of mass-balance, see validate.
+    kwargs
+        Additional arguments passed to the read function (e.g. io.read_from_SCOR).
+
+    Returns
+    -------
+    report : pd.DataFrame
+        See validate, 'Foodweb' column contains file paths
+        and 'Message' contains errors of files which could not be read.
+    '''
+    kwargs['eager'] = False
+    reports = []
+    for path in _list_files(directory):
+        # foodwebs are validated one by one, so only one of them is kept in memory
+        try:
+            food_web = _get_reader(path, format)(path, **kwargs)
+        except Exception as e:
+            reports.append(_report([path], None, None, 'read_error', np.nan, str(e)))
+            continue
+        food_web.title = path
+        reports.extend(_validate_food_web(food_web, tol))
+
+    if not reports:
+        return _report([], None, None, 'read_error', [])
+    return pd.concat(reports, ignore_index=True)
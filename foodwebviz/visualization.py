@@ -15,6 +15,8 @@ import foodwebviz as fw
 __all__ = [
     'draw_heatmap',
     'draw_trophic_flows_heatmap',
+    'animate_heatmap',
+    'animate_trophic_flows_heatmap',
     'draw_trophic_flows_distribution',
     'draw_network_for_nodes'
 ]
@@ -108,14 +110,14 @@ def _get_trophic_flows(food_web):
     trophic_flows : pd.DataFrame
         Columns: ["from", "to", "wegiths"], where "from" and "to" are trophic levels.
     '''
-    graph = food_web.get_graph(False, mark_alive_nodes=False, normalization='linear')
+    flows = food_web.get_flow_weights(normalization='linear')
 
     trophic_flows = defaultdict(float)
-    trophic_levels = {node: level for node, level in graph.nodes(data='TrophicLevel')}
-    for edge in graph.edges(data=True):
-        trophic_from = decimal.Decimal(trophic_levels[edge[0]]).to_integral_value()
-        trophic_to = decimal.Decimal(trophic_levels[edge[1]]).to_integral_value()
-        trophic_flows[(trophic_from, trophic_to)] += edge[2]['weight']
+    trophic_levels = food_web.node_df.TrophicLevel.to_dict()
+    for node_from, node_to, weight in zip(flows.From, flows.To, flows.Weight):
+        trophic_from = decimal.Decimal(trophic_levels[node_from]).to_integral_value()
+        trophic_to = decimal.Decimal(trophic_levels[node_to]).to_integral_value()
+        trophic_flows[(trophic_from, trophic_to)] += weight
 
     return pd.DataFrame([(x, y, w) for (x, y), w in trophic_flows.items()], columns=['from', 'to', 'weights'])
 
@@ -164,15 +166,17 @@ def draw_heatmap(food_web, boundary=False, normalization='log',
     heatmap : plotly.graph_objects.Figure
     '''
 
-    graph = food_web.get_graph(boundary, mark_alive_nodes=True, normalization=normalization)
+    # node attributes are read from the graph, weights from the cached weight layer
+    graph = food_web.get_graph(boundary, mark_alive_nodes=True)
+    flows = food_web.get_flow_weights(boundary, mark_alive_nodes=True, normalization=normalization)
     if switch_axes:
-        to_nodes, from_nodes, z = list(zip(*graph.edges(data=True)))
+        to_nodes, from_nodes = flows.From.tolist(), flows.To.tolist()
         hovertemplate = '%{x} --> %{y}: %{z:.3f}<extra></extra>'
     else:
-        from_nodes, to_nodes, z = list(zip(*graph.edges(data=True)))
+        from_nodes, to_nodes = flows.From.tolist(), flows.To.tolist()
         hovertemplate = '%{y} --> %{x}: %{z:.3f}<extra></extra>'
 
-    z = [w['weight'] for w in z]
+    z = flows.Weight.tolist()
 
     fig = go.Figure()
     if show_trophic_layer:
@@ -195,8 +199,7 @@ def draw_heatmap(food_web, boundary=False, normalization='log',
 
     # fix color bar for log normalization
     if normalization == 'log':
-        z_orginal = [x[2]['weight'] for x in food_web.get_graph(
-            boundary, mark_alive_nodes=True, normalization='linear').edges(data=True)]
+        z_orginal = food_web.get_flow_weights(boundary, normalization='linear').Weight.tolist()
 
         heatmap.colorbar = _get_log_colorbar(z_orginal)
         heatmap.customdata = z_orginal
@@ -300,6 +303,70 @@ def draw_trophic_flows_heatmap(food_web,
     return fig
 
 
+def _animate(figures, labels):
+    '''Combines figures into one plotly figure with a frame per figure and a time slider.'''
+    fig = go.Figure(data=figures[0].data, layout=figures[0].layout)
+    fig.frames = [go.Frame(data=f.data, name=str(label)) for f, label in zip(figures, labels)]
+
+    step_args = {'mode': 'immediate', 'frame': {'duration': 0, 'redraw': True}, 'transition': {'duration': 0}}
+    fig.update_layout(
+        updatemenus=[{
+            'type': 'buttons',
+            'showactive': False,
+            'x': 0,
+            'y': 0,
+            'xanchor': 'right',
+            'yanchor': 'top',
+            'buttons': [{'label': 'Play', 'method': 'animate',
+                         'args': [None, {**step_args, 'frame': {'duration': 1000, 'redraw': True},
+                                         'fromcurrent': True}]}]
+        }],
+        sliders=[{
+            'active': 0,
+            'steps': [{'label': str(label), 'method': 'animate', 'args': [[str(label)], step_args]}
+                      for label in labels]
+        }]
+    )
+    return fig
+
+
+def animate_heatmap(food_web_series, **kwargs):
+    '''Visualize a series of foodwebs as an animated heatmap, one frame per snapshot.
+
+    Parameters
+    ----------
+    food_web_series : series.FoodWebSeries
+        Series of foodwebs.
+    kwargs
+        Additional arguments passed to draw_heatmap.
+
+    Returns
+    -------
+    heatmap : plotly.graph_objects.Figure
+    '''
+    figures = [draw_heatmap(food_web, **kwargs) for food_web in food_web_series]
+    return _animate(figures, food_web_series.times)
+
+
+def animate_trophic_flows_heatmap(food_web_series, **kwargs):
+    '''Visualize flows between trophic levels of a series of foodwebs as an animated heatmap,
+    one frame per snapshot.
+
+    Parameters
+    ----------
+    food_web_series : series.FoodWebSeries
+        Series of foodwebs.
+    kwargs
+        Additional arguments passed to draw_trophic_flows_heatmap.
+
+    Returns
+    -------
+    heatmap : plotly.graph_objects.Figure
+    '''
+    figures = [draw_trophic_flows_heatmap(food_web, **kwargs) for food_web in food_web_series]
+    return _animate(figures, food_web_series.times)
+
+
 def draw_trophic_flows_distribution(food_web, normalize=True, width=1000, height=800, font_size=24):
     '''Visualize flows between trophic levels as a stacked bar chart.
 
@@ -393,18 +460,22 @@ def draw_network_for_nodes(food_web,
                  layout=True,
                  font_color='white',
                  heading='')  # food_web.title)
-    g = food_web.get_graph(mark_alive_nodes=True, no_flows_to_detritus=no_flows_to_detritus).copy()
-
-    if not nodes:
-        nodes = g.nodes()
-
-    g = g.edge_subgraph([(x[0], x[1]) for x in g.edges() if x[0].replace(
-        f'{fw.NOT_ALIVE_MARK} ', '') in nodes or x[1].replace(f'{fw.NOT_ALIVE_MARK} ', '') in nodes])
-
     colors = plt.cm.get_cmap(cmap)
     norm = matplotlib.colors.Normalize(vmin=food_web.node_df.TrophicLevel.min(),
                                        vmax=food_web.node_df.TrophicLevel.max())
 
+    if nodes:
+        # only selected nodes and their direct neighbours are needed
+        food_web = food_web.subweb(nodes, include_neighbours=1)
+    g = food_web.get_graph(mark_alive_nodes=True, no_flows_to_detritus=no_flows_to_detritus).copy()
+
+    if nodes:
+        mapping = fw.is_alive_mapping(food_web)
+        nodes = {mapping.get(x, x) for x in nodes}
+        g = g.edge_subgraph([x for x in g.edges() if x[0] in nodes or x[1] in nodes])
+    else:
+        g = g.edge_subgraph(g.edges())
+
     a = {x: {'color': f"rgb({', '.join(map(str, colors(norm(attrs['TrophicLevel']), bytes=True)[:3]))})",
              'level': -attrs['TrophicLevel'],
              'title': f'''{x}<br> TrophicLevel: {attrs["TrophicLevel"]:.2f}
@@ -62,6 +62,10 @@ def parse_requirements_file(filename):
 
 
 install_requires = parse_requirements_file("requirements.txt")
+# optional dependencies, e.g. pip install foodwebviz[parquet]
+extras_require = {
+    "parquet": ["pyarrow"],
+}
 
 with open("README.md", "r", encoding='utf-8') as fh:
     long_description = fh.read()
@@ -83,6 +87,7 @@ if __name__ == "__main__":
         project_urls=project_urls,
         classifiers=classifiers,
         install_requires=install_requires,
+        extras_require=extras_require,
         python_requires=">=3.7",
         zip_safe=False,
     )